@@ -4,45 +4,52 @@ from pathlib import Path
 
 root_dir = Path(__file__).parent.parent.parent
 sys.path.append(str(root_dir))
-from src.services.google_pydrive2 import GooglePyDrive2
-from src.services.supabase_service import SupabaseService
-from src.services.support_claude import AnthropicService
+from src.services.exceptions import SupabaseAuthenticationError
+from src.shared_components.service_wrapper import (
+    get_anthropic_service,
+    get_pydrive_service,
+    get_supabase_service,
+    get_test_users,
+    get_todos,
+    refresh_auth_session,
+    session_expired,
+    show_cache_stats,
+    warm_services,
+)
+
+
+@st.cache_data(show_spinner=False)
+def _read_markdown(name):
+    """Read a markdown file from docs/ once per process."""
+    return (Path(__file__).parent / "docs" / name).read_text()
 
 
 def show_privacy_policy():
-    privacy_policy_path = Path(__file__).parent / "docs" / "privacy-policy.md"
-    with open(privacy_policy_path, "r") as f:
-        privacy_policy_content = f.read()
-    st.markdown(privacy_policy_content)
+    st.markdown(_read_markdown("privacy-policy.md"))
 
 
 def show_terms_of_service():
-    terms_path = Path(__file__).parent / "docs" / "terms-of-service.md"
-    with open(terms_path, "r") as f:
-        terms_content = f.read()
-    st.markdown(terms_content)
+    st.markdown(_read_markdown("terms-of-service.md"))
 
 
 def show_supabase_management():
     st.title("Supabase Drive Anthropic Test")
 
-    url_key = st.secrets["SUPABASE_URL"]
-    api_key = st.secrets["SUPABASE_KEY"]
     test_email = st.secrets["TEST_EMAIL"]
     test_password = st.secrets["TEST_PASSWORD"]
     # st.write(test_email)
     # st.write(test_password)
-    supabase_client = SupabaseService(url_key, api_key)
-    supabase_client.login(test_email, test_password)
-    users = supabase_client.get_test_users()
-    todos = supabase_client.get_todos()
-    todos_data = todos.data if hasattr(todos, "data") else []
-    st.write(f"Number of todos: {len(todos_data)}")
+    supabase_client = get_supabase_service()
+    # Sign the session's service in once; later reruns reuse its session
+    if supabase_client.session is None:
+        supabase_client.login_sync(test_email, test_password)
+    # Only the counts are shown, so fetch just the ids
+    users = get_test_users(supabase_client, ("id",))
+    todos = get_todos(supabase_client, ("id",))
+    st.write(f"Number of todos: {len(todos)}")
 
     # st.write(users)
-    # Convert the APIResponse to a list or dict before using len()
-    users_data = users.data if hasattr(users, "data") else []
-    st.write(f"Number of users: {len(users_data)}")
+    st.write(f"Number of users: {len(users)}")
 
     show_first_mp4_video()
     show_anthropic_test()
@@ -52,10 +59,28 @@ def show_supabase_management():
 def show_supabase_auth():
     st.subheader("Supabase Auth Test")
 
-    supabase_url = st.secrets["SUPABASE_URL"]
-    supabase_key = st.secrets["SUPABASE_KEY"]
+    # Reuse the session from an earlier rerun instead of signing in again.
+    # Expiry is checked locally so a valid session costs no auth round-trip.
+    auth_session = st.session_state.get("auth_session")
+    if auth_session and session_expired(auth_session):
+        auth_session = refresh_auth_session(auth_session)
+        if auth_session:
+            st.session_state.auth_session = auth_session
+        else:
+            del st.session_state.auth_session
+    if auth_session:
+        st.success(f"Signed in as {auth_session['user']['email']}")
+        if st.button("Sign Out"):
+            try:
+                get_supabase_service().logout_sync()
+            except SupabaseAuthenticationError:
+                pass  # still drop the local session if the server call fails
+            del st.session_state.auth_session
+            st.session_state.pop("authenticated", None)
+            st.rerun()
+        return
 
-    supabase = SupabaseService(supabase_url, supabase_key)
+    supabase = get_supabase_service()
 
     # Create signup form
     email = st.text_input("Email")
@@ -63,15 +88,15 @@ def show_supabase_auth():
 
     if st.button("Sign Up"):
         if email and password:
-            # Handle signup directly without async/await
-            with st.spinner("Signing up..."):
-                auth_response = supabase.login(email, password)
-                st.write(auth_response)
-                # if auth_response:
-                #     st.session_state.auth_session = auth_response
-                #     st.session_state.authenticated = True
-                st.success(f"Login successful! Welcome, {auth_response.user.email}")
-                st.rerun()  # Rerun to update the UI
+            with st.spinner("Signing in..."):
+                try:
+                    auth_response = supabase.login_sync(email, password)
+                except SupabaseAuthenticationError as e:
+                    st.error(str(e))
+                    return
+            st.session_state.auth_session = auth_response
+            st.session_state.authenticated = True
+            st.rerun()  # Rerun to update the UI
 
                 # if response.success:
                 #     if response.needs_email_confirmation:
@@ -86,30 +111,37 @@ def show_supabase_auth():
 
 def show_anthropic_test():
     st.subheader("Anthropic Test")
-    api_key = st.secrets["ANTHROPIC_API_KEY"]
-    claude = AnthropicService(api_key)
+    claude = get_anthropic_service()
     response_basic, response_complex, response_follow_up = claude.test_anthropic()
     st.write(response_basic)
     st.write(response_complex)
     st.write(response_follow_up)
 
 
+@st.cache_data(ttl=300, show_spinner=False)
+def _first_mp4(_drive):
+    """Return the first mp4's id and title, cached so reruns skip the Drive query.
+
+    The leading underscore keeps Streamlit from hashing the drive client.
+    """
+    file_list = _drive.ListFile()
+    if not file_list:
+        return None
+    return {"id": file_list[0]["id"], "title": file_list[0]["title"]}
+
+
 def show_first_mp4_video():
-    private_key = st.secrets["PRIVATE_KEY"]
-    private_key_id = st.secrets["PRIVATE_KEY_ID"]
-    client_email = st.secrets["CLIENT_EMAIL"]
-    client_id = st.secrets["CLIENT_ID"]
-    drive = GooglePyDrive2(private_key, private_key_id, client_email, client_id)
+    drive = get_pydrive_service()
     if not drive:
-        st.error("Failed to authenticate with PyDrive")
         return
 
+    if st.button("Refresh", key="refresh_first_mp4"):
+        _first_mp4.clear()
+
     try:
-        # Query to search for mp4 files
-        file_list = drive.ListFile()
+        first_mp4 = _first_mp4(drive)
 
-        if file_list:
-            first_mp4 = file_list[0]
+        if first_mp4:
             st.write(f"Title: {first_mp4['title']}")
 
             # Get the file ID and create a direct streaming link
@@ -136,6 +168,9 @@ def main():
         layout="wide",
         initial_sidebar_state="expanded",
     )
+    warm_error = warm_services()
+    if warm_error:
+        st.error(warm_error)
 
     # Add custom CSS and meta tag
     st.markdown(
@@ -158,6 +193,7 @@ def main():
     page = st.sidebar.radio(
         "Go to", ["Supabase Management", "Privacy Policy", "Terms of Service"]
     )
+    show_cache_stats()
 
     # Display the selected page
     if page == "Supabase Management":
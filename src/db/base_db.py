@@ -1,6 +1,9 @@
 from typing import TypeVar, Optional, List, Dict, Any, Generic
-from datetime import datetime
+from datetime import datetime, timezone
+import asyncio
+import itertools
 import logging
+import time
 from abc import ABC, abstractmethod
 
 T = TypeVar("T", bound=Dict[str, Any])
@@ -30,6 +33,11 @@ class ConnectionError(DatabaseError):
     pass
 
 
+def _utc_now() -> str:
+    """Current UTC time as the ISO string PostgREST stores for timestamptz."""
+    return datetime.now(timezone.utc).isoformat()
+
+
 class BaseDB(ABC, Generic[T]):
     """
     Abstract base class for database operations.
@@ -39,10 +47,15 @@ class BaseDB(ABC, Generic[T]):
     # Standard field sets that all tables should have
     # BASE_FIELDS = ["id", "created_at", "updated_at", "is_active"]
 
+    VERIFY_TTL = 60  # seconds a successful connection check is trusted
+    INSERT_CHUNK_SIZE = 500  # rows per insert request in add_many
+    MAX_CONCURRENT_INSERTS = 8
+
     def __init__(self, supabase_client):
         self.supabase = supabase_client
         self.logger = logging.getLogger(self.__class__.__name__)
         self.table_name: str = ""  # Must be set by child class
+        self._verified_at = 0.0
 
     @abstractmethod
     async def _validate_data(self, data: Dict[str, Any]) -> bool:
@@ -50,11 +63,21 @@ class BaseDB(ABC, Generic[T]):
         raise NotImplementedError
 
     async def _verify_connection(self) -> bool:
-        """Verify the database connection is active"""
+        """Verify the database connection is active.
+
+        A success is trusted for VERIFY_TTL seconds, and the check itself
+        fetches a single id rather than the whole column.
+        """
+        if time.monotonic() - self._verified_at < self.VERIFY_TTL:
+            return True
         try:
-            await self.supabase.select_from_table(self.table_name, ["id"], [])
+            await self.supabase.select_from_table(
+                self.table_name, ["id"], [], limit=1
+            )
+            self._verified_at = time.monotonic()
             return True
         except Exception as e:
+            self._verified_at = 0.0
             self.logger.error(f"Failed to verify database connection: {str(e)}")
             raise ConnectionError("Could not establish database connection") from e
 
@@ -66,6 +89,10 @@ class BaseDB(ABC, Generic[T]):
             if not self.supabase:
                 raise ConnectionError("No database connection available")
             return await operation_func(*args, **kwargs)
+        except ConnectionError:
+            # Make the next _verify_connection() really check again
+            self._verified_at = 0.0
+            raise
         except DatabaseError:
             raise
         except Exception as e:
@@ -79,8 +106,7 @@ class BaseDB(ABC, Generic[T]):
             raise ValidationError("Invalid data provided")
 
         async def _add_operation():
-            data["created_at"] = datetime.utcnow()
-            data["updated_at"] = datetime.utcnow()
+            data["created_at"] = data["updated_at"] = _utc_now()
             result = await self.supabase.insert_into_table(self.table_name, data)
             if not result:
                 raise DatabaseError("Failed to create record")
@@ -109,7 +135,7 @@ class BaseDB(ABC, Generic[T]):
             raise ValidationError("Invalid update data provided")
 
         async def _update_operation():
-            data["updated_at"] = datetime.utcnow()
+            data["updated_at"] = _utc_now()
             result = await self.supabase.update_table(
                 self.table_name, data, [("id", "eq", record_id)]
             )
@@ -136,36 +162,51 @@ class BaseDB(ABC, Generic[T]):
     # Utility Methods
     async def exists(self, record_id: str) -> bool:
         """Check if a record exists"""
-        try:
-            await self.get_by_id(record_id, ["id"])
-            return True
-        except RecordNotFoundError:
-            return False
+
+        async def _exists_operation():
+            result = await self.supabase.select_from_table(
+                self.table_name, ["id"], [("id", "eq", record_id)], limit=1
+            )
+            return bool(result)
+
+        return await self._handle_db_operation("exists", _exists_operation)
 
     async def count(self, filters: Optional[List[tuple]] = None) -> int:
         """Count records matching the given filters"""
 
         async def _count_operation():
-            result = await self.supabase.select_from_table(
-                self.table_name, ["count"], filters or []
-            )
-            return result[0]["count"]
+            return await self.supabase.count_rows(self.table_name, filters)
 
         return await self._handle_db_operation("count", _count_operation)
 
     # Batch Operations
     async def add_many(self, items: List[Dict[str, Any]]) -> List[T]:
-        """Add multiple records in a single operation"""
-        for item in items:
-            if not await self._validate_data(item):
+        """Add multiple records.
+
+        Up to INSERT_CHUNK_SIZE rows go in one all-or-nothing request. Larger
+        lists are split into chunks sent concurrently, so if one chunk fails
+        the others may already have been inserted.
+        """
+        results = await asyncio.gather(*(self._validate_data(item) for item in items))
+        for item, valid in zip(items, results):
+            if not valid:
                 raise ValidationError(f"Invalid data in batch: {item}")
 
         async def _add_many_operation():
-            now = datetime.utcnow()
+            now = _utc_now()
             for item in items:
-                item["created_at"] = now
-                item["updated_at"] = now
-            result = await self.supabase.insert_into_table(self.table_name, items)
+                item["created_at"] = item["updated_at"] = now
+
+            semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_INSERTS)
+
+            async def _insert_chunk(chunk):
+                async with semaphore:
+                    return await self.supabase.insert_many(self.table_name, chunk)
+
+            size = self.INSERT_CHUNK_SIZE
+            chunks = [items[i : i + size] for i in range(0, len(items), size)]
+            results = await asyncio.gather(*(_insert_chunk(c) for c in chunks))
+            result = list(itertools.chain.from_iterable(results))
             if not result:
                 raise DatabaseError("Failed to create records")
             return result
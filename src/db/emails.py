@@ -1,11 +1,19 @@
 import os
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
+import hashlib
 import imaplib
 import email
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from email.header import decode_header
+from email.parser import BytesHeaderParser
+from typing import Iterator
+import httpx
 import pandas as pd
 import time
 
@@ -13,26 +21,95 @@ import time
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.append(project_root)
 
-from src.db.base_db import BaseDB
+from src.db.base_db import BaseDB, ValidationError
+from src.services.env import ensure_env_loaded
+from src.services.exceptions import SupabaseQueryError
 from src.services.supabase_service import SupabaseService
 
+# http(s) URLs, ending at whitespace, angle brackets, quotes or a closing paren
+URL_RE = re.compile(r"https?://[^\s<>\"')]+")
+
+# Parses headers only and stops at the first blank line
+HEADER_PARSER = BytesHeaderParser()
+
+
+@lru_cache(maxsize=None)
+def get_supabase(url: str, key: str) -> SupabaseService:
+    """Returns one SupabaseService per (url, key), built on first use."""
+    return SupabaseService(url, key)
+
 
 class Emails(BaseDB):
+    FETCH_BATCH_SIZE = 100  # messages per IMAP FETCH command
+    HASH_LOOKUP_BATCH_SIZE = 100  # content hashes per "in" query
+    IMAP_CONNECTIONS = 4  # parallel sessions for downloading; Gmail allows 15
+    IMPORT_WORKERS = 4  # CSV batches being inserted at once
+    MAX_INSERT_RETRIES = 5  # attempts per batch when rate limited
+    # PEEK leaves the \Seen flag alone while the sender is checked
+    SENDER_HEADER_QUERY = "(BODY.PEEK[HEADER.FIELDS (FROM)])"
+    SEARCH_ADDRESS_BATCH = 20  # FROM terms per IMAP SEARCH command
+    STORE_BATCH_SIZE = 200  # parsed emails per round of database writes
+    STORE_QUEUE_SIZE = 1000  # parsed emails waiting for the writer thread
+
     def __init__(
         self,
         supabase_client: SupabaseService = None,
         gmail_address: str = None,
         password: str = None,
     ) -> None:
-        super().__init__()
         if not supabase_client:
             raise ValueError("Supabase client cannot be None")
-        self.supabase = supabase_client
+        super().__init__(supabase_client)
         self.table_name = "emails"
         self.imap_server = "imap.gmail.com"
         self.imap_port = 993
         self.gmail_address = gmail_address
         self.password = password
+        self._mail = None
+
+    async def _validate_data(self, data: dict) -> bool:
+        """
+        Checks that a row for the emails table has a sender and content.
+
+        Args:
+            data (dict): Column values for one email
+
+        Returns:
+            bool: True when the row can be stored
+        """
+        for field in ("sender", "content"):
+            if data.get(field) is None:
+                raise ValidationError(f"Missing required field: {field}")
+        return True
+
+    def __enter__(self) -> "Emails":
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def connect(self) -> None:
+        """
+        Opens an IMAP session that extract_recent_emails reuses until close().
+
+        Lets a caller process several date ranges without a new TLS
+        handshake, login and inbox selection for each one.
+        """
+        if self._mail is None:
+            mail = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
+            self._login(mail)
+            self._mail = mail
+
+    def close(self) -> None:
+        """
+        Logs out of the session opened by connect(), if there is one.
+        """
+        if self._mail is not None:
+            try:
+                self._mail.logout()
+            finally:
+                self._mail = None
 
     def set_begin_and_end_date(self, begin_date: datetime, end_date: datetime) -> None:
         """
@@ -48,21 +125,82 @@ class Emails(BaseDB):
         self.end_date_str = end_date.strftime("%d-%b-%Y")
         self.begin_date_str = begin_date.strftime("%d-%b-%Y")
 
+    def import_csv_in_batches(self, csv_file_path: str, batch_size: int = 500) -> int:
+        """
+        Imports rows from a CSV file into the emails table in batches.
+
+        Args:
+            csv_file_path (str): Path to a CSV file whose columns match the table
+            batch_size (int): Number of rows read and inserted at a time
+
+        Returns:
+            int: Number of rows inserted
+
+        The file is read batch_size rows at a time and up to IMPORT_WORKERS
+        batches are inserted at once, so memory use does not grow with the
+        size of the file. Batches only wait when Supabase rate limits them.
+        """
+        inserted = 0
+        in_flight = []
+        with ThreadPoolExecutor(max_workers=self.IMPORT_WORKERS) as executor:
+            for batch_number, batch_df in enumerate(
+                pd.read_csv(csv_file_path, chunksize=batch_size), start=1
+            ):
+                # Empty cells become None; NaN is not valid JSON
+                batch_df = batch_df.astype(object).where(batch_df.notna(), None)
+                rows = batch_df.to_dict(orient="records")
+                in_flight.append(executor.submit(self._insert_with_backoff, rows))
+
+                # Keep reading only while there is a free worker
+                if len(in_flight) >= self.IMPORT_WORKERS:
+                    inserted += len(in_flight.pop(0).result())
+                    self.logger.info(
+                        f"Read batch {batch_number} ({inserted} rows inserted so far)"
+                    )
+            for future in in_flight:
+                inserted += len(future.result())
+        self.logger.info(f"Imported {inserted} rows from {csv_file_path}")
+        return inserted
+
+    def _insert_with_backoff(self, rows: list) -> list:
+        """
+        Inserts rows, retrying with exponential backoff while rate limited.
+
+        Args:
+            rows (list): Row dictionaries for the emails table
+
+        Returns:
+            list: The inserted records
+        """
+        for attempt in range(self.MAX_INSERT_RETRIES):
+            try:
+                return self.supabase.insert_many_sync(self.table_name, rows)
+            except SupabaseQueryError as e:
+                error = e.original_error
+                rate_limited = (
+                    isinstance(error, httpx.HTTPStatusError)
+                    and error.response.status_code == 429
+                )
+                if not rate_limited or attempt == self.MAX_INSERT_RETRIES - 1:
+                    raise
+                retry_after = error.response.headers.get("retry-after", "")
+                delay = int(retry_after) if retry_after.isdigit() else 2**attempt
+                self.logger.warning(f"Rate limited, retrying batch in {delay}s")
+                time.sleep(delay)
+
     def get_email_addresses(self) -> list:
         """
         Gets a list of email addresses from the database.
 
         Returns:
             list: List of email addresses
-        """
-        result = self.supabase.select_from_table("emails", ["sender"], [])
 
-        # Extract unique email addresses from results
-        email_addresses = []
-        if result:
-            email_addresses = list(set([record["sender"] for record in result]))
+        Reads the distinct_senders view, so the deduplication happens in
+        Postgres and only one row per sender comes over the wire.
+        """
+        result = self.supabase.select_from_table_sync("distinct_senders", ["sender"], [])
 
-        return email_addresses
+        return [record["sender"] for record in result] if result else []
 
     #  high level call called by extract_messages_from_important_emails
     def extract_recent_emails(self, important_addresses: list) -> list:
@@ -79,6 +217,9 @@ class Emails(BaseDB):
         Returns:
             list: A list of dictionaries containing extracted email data
 
+        Raises:
+            SupabaseQueryError: If storing any batch failed; earlier batches stay stored
+
         This function:
         1. Connects to Gmail's IMAP server
         2. Searches for emails within the specified date range
@@ -89,243 +230,261 @@ class Emails(BaseDB):
         Improvements needed:
         - Implement error handling for network issues
         - Add support for OAuth 2.0 authentication
-        - Optimize database operations (use batch inserts)
         - Implement rate limiting to avoid API restrictions
         - Add logging for better debugging
         - Separate database operations into a different function
         - Handle different email encodings more robustly
-        - Implement parallel processing for faster extraction of large email volumes
         """
-        # Connect to Gmail's IMAP server
-        mail = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
+        # Constant-time lookups; addresses compare case-insensitively
+        important_addresses = frozenset(a.lower() for a in important_addresses)
+
+        # Reuse the session from connect(), or open one just for this call
+        owns_connection = self._mail is None
+        mail = None
+
+        # Parsed emails are written by a separate thread while IMAP fetching
+        # and parsing carry on here; None tells it no more are coming
+        store_queue = queue.Queue(maxsize=self.STORE_QUEUE_SIZE)
+        store_errors = []
+        writer = threading.Thread(
+            target=self._db_worker,
+            args=(store_queue, store_errors),
+            name="email-writer",
+        )
+        writer.start()
+        emails = []
 
         try:
-            # Login to the account
-            mail.login(self.gmail_address, self.password)
-
-            # Select the inbox
-            mail.select("inbox")
+            if owns_connection:
+                mail = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
+                self._login(mail)
+            else:
+                mail = self._mail
 
             self.logger.info(
                 f"Searching for emails from {self.begin_date_str} to {self.end_date_str}"
             )
 
-            # Search for emails within the specified date range
-            _, message_numbers = mail.search(
-                None, f'(SINCE "{self.begin_date_str}" BEFORE "{self.  end_date_str}")'
-            )
-
-            emails = []
-
-            for num in message_numbers[0].split():
-                # Fetch the email message by ID
-                _, msg = mail.fetch(num, "(RFC822)")
-                for response in msg:
-                    if isinstance(response, tuple):
-                        # Parse the email content
-                        email_body = email.message_from_bytes(response[1])
-
-                        # Get the date
-                        date_str = email_body.get("Date")
-                        if date_str:
-                            date = email.utils.parsedate_to_datetime(date_str)
-                        else:
-                            self.logger.warning("No date found for email. Skipping...")
+            # Let the server pick the messages in the date range that
+            # come from an important address
+            candidate_ids = self._search_from(mail, important_addresses)
+
+            # IMAP FROM matches substrings, so confirm the exact sender from
+            # the From header before downloading the full message
+            important_ids = []
+            for response in self._fetch_messages(
+                mail, candidate_ids, self.SENDER_HEADER_QUERY
+            ):
+                headers = HEADER_PARSER.parsebytes(response[1])
+                sender = email.utils.parseaddr(headers.get("From", ""))[1]
+                if sender.lower() in important_addresses:
+                    important_ids.append(response[0].split(None, 1)[0])
+
+            for raw_message in self._download_messages(mail, important_ids):
+                # Parse the email content
+                email_body = email.message_from_bytes(raw_message)
+
+                # Get the date
+                date_str = email_body.get("Date")
+                if date_str:
+                    date = email.utils.parsedate_to_datetime(date_str)
+                else:
+                    self.logger.warning("No date found for email. Skipping...")
+                    continue
+
+                # Get the sender; already checked against the From header above
+                from_header = email_body.get("From", "")
+                sender = email.utils.parseaddr(from_header)[1]
+
+                self.logger.info(f"Processing email from {sender}")
+                # Decode the subject
+                subject_header = email_body.get("Subject", "")
+                subject, encoding = decode_header(subject_header)[0]
+                if isinstance(subject, bytes):
+                    subject = subject.decode(encoding or "utf-8")
+
+                to_recipients = self._extract_to_recipients(email_body)
+                # Convert to_recipients dictionary to a string
+                to_recipients_str = ""
+                if (
+                    isinstance(to_recipients, dict)
+                    and "recipients" in to_recipients
+                ):
+                    to_recipients_str = ", ".join(to_recipients["recipients"])
+
+                # Extract the email text and attachment information,
+                # walking the MIME tree once for both
+                content = ""
+                attachments = []
+                if email_body.is_multipart():
+                    found_text = False
+                    for part in email_body.walk():
+                        if part.get_content_maintype() == "multipart":
                             continue
-
-                        # Get the sender
-                        from_header = email_body.get("From", "")
-                        sender = email.utils.parseaddr(from_header)[1]
-
-                        # Continue if sender is not in important_addresses
-                        if sender not in important_addresses:
+                        if not found_text and part.get_content_type() == "text/plain":
+                            found_text = True
+                            content = self._safe_decode(
+                                part.get_payload(decode=True),
+                                part.get_content_charset(),
+                            )
+                        if part.get("Content-Disposition") is None:
                             continue
-
-                        self.logger.info(f"Processing email from {sender}")
-                        # Decode the subject
-                        subject_header = email_body.get("Subject", "")
-                        subject, encoding = decode_header(subject_header)[0]
-                        if isinstance(subject, bytes):
-                            subject = subject.decode(encoding or "utf-8")
-
-                        to_recipients = self._extract_to_recipients(email_body)
-                        # Convert to_recipients dictionary to a string
-                        to_recipients_str = ""
+                        filename = part.get_filename()
                         if (
-                            isinstance(to_recipients, dict)
-                            and "recipients" in to_recipients
+                            filename
+                            and isinstance(filename, str)
+                            and len(filename.strip()) > 0
                         ):
-                            to_recipients_str = ", ".join(to_recipients["recipients"])
-
-                        # Extract and store the email text
-                        content = ""
-                        if email_body.is_multipart():
-                            for part in email_body.walk():
-                                if part.get_content_type() == "text/plain":
-                                    try:
-                                        content = part.get_payload(decode=True).decode(
-                                            encoding or "utf-8"
-                                        )
-                                    except UnicodeDecodeError:
-                                        try:
-                                            content = part.get_payload(
-                                                decode=True
-                                            ).decode("latin-1")
-                                        except UnicodeDecodeError:
-                                            self.logger.error(
-                                                f"Failed to decode email content for {subject}"
-                                            )
-                                            content = "Unable to decode email content"
-                                    break
-                        else:
-                            try:
-                                content = email_body.get_payload(decode=True).decode(
-                                    encoding or "utf-8"
-                                )
-                            except UnicodeDecodeError:
-                                try:
-                                    content = email_body.get_payload(
-                                        decode=True
-                                    ).decode("latin-1")
-                                except UnicodeDecodeError:
-                                    self.logger.error(
-                                        f"Failed to decode email content for {subject}"
-                                    )
-                                    content = "Unable to decode email content"
-
-                        urls = self._extract_urls_from_email(content)
-
-                        # Extract attachment information
-                        attachments = []
-                        if email_body.is_multipart():
-                            for part in email_body.walk():
-                                if part.get_content_maintype() == "multipart":
-                                    continue
-                                if part.get("Content-Disposition") is None:
-                                    continue
-                                filename = part.get_filename()
-                                if (
-                                    filename
-                                    and isinstance(filename, str)
-                                    and len(filename.strip()) > 0
-                                ):
-                                    payload = part.get_payload(decode=True)
-                                    if payload is not None:
-                                        file_size = len(payload)
-                                        attachments.append(
-                                            {"filename": filename, "size": file_size}
-                                        )
-
-                        email_data = {
-                            "subject": subject,
-                            "sender": sender,
-                            "date": date,
-                            "attachments": attachments,
-                            "to_recipients": to_recipients,
-                            "content": content,
-                            "urls": urls if urls else {"urls": []},
-                        }
-
-                        emails.append(email_data)
-
-                        # Write the email to the database
-                        # conn = connect_db()
-                        # cursor = conn.cursor()
-
-                        # Check if email already exists with same sender, date and content
-                        try:
-                            # cursor.execute(
-                            #     """
-                            #     SELECT email_id FROM emails
-                            #     WHERE sender = ?
-                            #     AND date = ?
-                            #     AND content = ?
-                            #     """,
-                            #     (email_data["sender"], email_data["date"], email_data["content"]),
-                            # )
-                            # existing_email = cursor.fetchone()
-                            existing_email_id = self._check_existing_email(email_data)
-
-                            if existing_email_id:
-                                self.logger.info(
-                                    f"Skipping duplicate email from {email_data['sender']} on {email_data['date']}"
+                            payload = part.get_payload(decode=True)
+                            if payload is not None:
+                                file_size = len(payload)
+                                attachments.append(
+                                    {"filename": filename, "size": file_size}
                                 )
-                                # cursor.close()
-                                # conn.close()
-                                continue
-
-                        except Exception as e:
-                            self.logger.error(f"Error checking for existing email: {e}")
-
-                        try:
-                            # cursor.execute(
-                            #     """
-                            #     INSERT INTO emails (date, sender, subject, to_recipients, content, attachment_cnt, url_cnt, created_at)
-                            #     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                            #     """,
-                            #     (
-                            #         email_data["date"],
-                            #         email_data["sender"],
-                            #         email_data["subject"],
-                            #         to_recipients_str,
-                            #         email_data["content"],
-                            #         len(email_data["attachments"]),
-                            #         len(email_data["urls"]["urls"]),
-                            #         datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            #     ),
-                            # )
-                            # conn.commit()
-                            # email_id = cursor.lastrowid
-                            email_id = self._insert_email(email_data, to_recipients_str)
-
-                            if email_id:
-                                # Write attachments to the attachments table
-                                for attachment in email_data["attachments"]:
-                                    # Strip leading "-" or " " from the filename
-                                    cleaned_filename = attachment["filename"].lstrip(
-                                        "- "
-                                    )
-                                    # cursor.execute(
-                                    #     """
-                                    # INSERT INTO attachments (email_id, filename, size, created_at)
-                                    # VALUES (?, ?, ?, ?)
-                                    # """,
-                                    #     (
-                                    #         email_id,
-                                    #         cleaned_filename,
-                                    #         attachment["size"],
-                                    #         datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                    #     ),
-                                    # )
-                                    self._insert_attachment(
-                                        email_id, cleaned_filename, attachment["size"]
-                                    )
-                                # Write URLs to the urls table
-                                for url in email_data["urls"]["urls"]:
-                                    # cursor.execute(
-                                    #     """
-                                    # INSERT INTO all_email_urls (email_id, url, created_at)
-                                    # VALUES (?, ?, ?)
-                                    # """,
-                                    #     (email_id, url, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-                                    # )
-                                    self._insert_url(email_id, url)
-                        except Exception as e:
-                            self.logger.error(
-                                f"Error inserting email into database: {e}"
-                            )
-            return emails
+                else:
+                    content = self._safe_decode(
+                        email_body.get_payload(decode=True),
+                        email_body.get_content_charset(),
+                    )
+
+                urls = self._extract_urls_from_email(content)
+
+                email_data = {
+                    "subject": subject,
+                    "sender": sender,
+                    "date": date,
+                    "attachments": attachments,
+                    "to_recipients": to_recipients,
+                    "content": content,
+                    "urls": urls if urls else {"urls": []},
+                }
+
+                emails.append(email_data)
+
+                # Handed to the writer thread, which stores them in batches
+                store_queue.put((email_data, to_recipients_str))
 
         except Exception as e:
             self.logger.error(f"An error occurred while extracting emails: {e}")
-            return []
+            emails = []
 
         finally:
-            # Close the connection
-            mail.logout()
+            # Let the writer finish what is queued before returning
+            store_queue.put(None)
+            writer.join()
+            # Close the connection unless it belongs to connect()
+            if owns_connection and mail is not None:
+                mail.logout()
+
+        if store_errors:
+            raise store_errors[0]
+        return emails
 
         # helper called by extract_recent_emails
 
+    def _login(self, mail) -> None:
+        """
+        Logs in to the account and selects the inbox.
+
+        Args:
+            mail (imaplib.IMAP4): Connection to the IMAP server
+        """
+        mail.login(self.gmail_address, self.password)
+        mail.select("inbox")
+
+    def _search_from(self, mail, addresses) -> list:
+        """
+        Searches the date range for messages from any of the given addresses.
+
+        Args:
+            mail (imaplib.IMAP4): Logged-in connection with the inbox selected
+            addresses (Iterable[str]): Sender addresses to search for
+
+        Returns:
+            list: Matching message sequence numbers in ascending order
+
+        IMAP's OR takes exactly two keys, so each SEARCH nests them as
+        OR FROM a OR FROM b FROM c. Addresses are sent SEARCH_ADDRESS_BATCH
+        at a time to keep commands short, and the results are merged.
+        """
+        date_range = f'SINCE "{self.begin_date_str}" BEFORE "{self.end_date_str}"'
+        addresses = sorted(addresses)
+        message_ids = set()
+        for start in range(0, len(addresses), self.SEARCH_ADDRESS_BATCH):
+            batch = addresses[start : start + self.SEARCH_ADDRESS_BATCH]
+            criteria = f'FROM "{batch[-1]}"'
+            for address in reversed(batch[:-1]):
+                criteria = f'OR FROM "{address}" {criteria}'
+            _, data = mail.search(None, f"({date_range} {criteria})")
+            message_ids.update(data[0].split())
+        return sorted(message_ids, key=int)
+
+    def _download_messages(self, mail, message_ids: list) -> Iterator[bytes]:
+        """
+        Downloads full messages over several IMAP sessions at once.
+
+        Args:
+            mail (imaplib.IMAP4): Logged-in connection with the inbox selected
+            message_ids (list): Message sequence numbers to download
+
+        Yields:
+            bytes: Raw RFC822 bytes of each message, in message_ids order
+
+        The ids are split into up to IMAP_CONNECTIONS contiguous slices. The
+        first slice is fetched on `mail` while each of the others gets its own
+        session on a worker thread, so the server works on them in parallel.
+        Sequence numbers are the same in every session as long as nothing
+        is expunged from the inbox meanwhile. Messages of the first slice
+        are yielded as they arrive, so the caller can start on them early.
+        """
+        if not message_ids:
+            return
+
+        shards = min(
+            self.IMAP_CONNECTIONS,
+            -(-len(message_ids) // self.FETCH_BATCH_SIZE),
+        )
+        size = -(-len(message_ids) // shards)
+        slices = [message_ids[i : i + size] for i in range(0, len(message_ids), size)]
+
+        def download_slice(ids):
+            session = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
+            try:
+                self._login(session)
+                return [response[1] for response in self._fetch_messages(session, ids)]
+            finally:
+                session.logout()
+
+        with ThreadPoolExecutor(max_workers=max(len(slices) - 1, 1)) as executor:
+            futures = [executor.submit(download_slice, ids) for ids in slices[1:]]
+            for response in self._fetch_messages(mail, slices[0]):
+                yield response[1]
+            for future in futures:
+                yield from future.result()
+
+    def _fetch_messages(self, mail, message_ids: list, parts: str = "(RFC822)"):
+        """
+        Fetches messages in batches and yields each message's response.
+
+        Args:
+            mail (imaplib.IMAP4): Logged-in connection with a mailbox selected
+            message_ids (list): Message sequence numbers as returned by search
+            parts (str): IMAP data items to fetch for each message
+
+        Yields:
+            tuple: (envelope, data) pair for one message
+
+        Fetching a comma separated set of FETCH_BATCH_SIZE ids costs one
+        server round trip instead of one per message.
+        """
+        for start in range(0, len(message_ids), self.FETCH_BATCH_SIZE):
+            message_set = b",".join(message_ids[start : start + self.FETCH_BATCH_SIZE])
+            _, data = mail.fetch(message_set.decode(), parts)
+            for response in data:
+                # Each message is a tuple; the closing b")" lines are skipped
+                if isinstance(response, tuple):
+                    yield response
+
     def _extract_to_recipients(self, email_body):
         """
         Extracts recipient email addresses from an email's To header.
@@ -337,10 +496,10 @@ class Emails(BaseDB):
             dict: Dictionary with key "recipients" containing list of extracted email addresses
 
         The function:
-        1. Gets the To header from the email message
-        2. Splits addresses on commas
-        3. Parses each address using email.utils.parseaddr
-        4. Returns dictionary with list of clean email addresses
+        1. Gets every To header from the email message
+        2. Parses them with email.utils.getaddresses, which handles quoted
+           commas ("Doe, John" <j@x>) and group syntax
+        3. Returns dictionary with list of clean email addresses
 
         Improvements needed:
         - Add input validation for email_body
@@ -350,16 +509,12 @@ class Emails(BaseDB):
         - Add option to preserve display names
         - Return empty list instead of empty dict when no recipients
         - Add logging for parsing errors
-        - Support group addresses (RFC 2822)
         """
-        to_header = email_body.get("To", "")
-
-        # Split the header into individual addresses
-        addresses = to_header.split(",")
-
-        # Extract email addresses using parseaddr and strip whitespace
+        # Keep only the addresses; entries that fail to parse come back empty
         recipients = [
-            email.utils.parseaddr(addr.strip())[1] for addr in addresses if addr.strip()
+            addr
+            for _name, addr in email.utils.getaddresses(email_body.get_all("To", []))
+            if addr
         ]
 
         # Create a dictionary with the "recipients" key and the list of recipients as the value
@@ -369,6 +524,35 @@ class Emails(BaseDB):
         return result
 
     # helper called by extract_recent_emails
+    @staticmethod
+    def _safe_decode(payload: bytes | None, charset: str | None = None) -> str:
+        """
+        Decodes a text part with its declared charset, falling back to UTF-8
+        and then latin-1.
+
+        Args:
+            payload (bytes | None): Decoded transfer payload of the part
+            charset (str | None): Charset from the part's Content-Type, if any
+
+        Returns:
+            str: The decoded text, or an empty string when there is no payload
+        """
+        if not payload:
+            return ""
+        # Most bodies are plain ASCII, which every ASCII-compatible charset
+        # decodes the same way; UTF-16/32 are not, so they take the slow path
+        if payload.isascii() and not (charset or "").lower().startswith(
+            ("utf-16", "utf-32")
+        ):
+            return payload.decode("ascii")
+        for encoding in (charset or "utf-8", "utf-8"):
+            try:
+                return payload.decode(encoding)
+            except (LookupError, UnicodeDecodeError):
+                continue
+        # latin-1 maps every byte, so this cannot fail
+        return payload.decode("latin-1")
+
     def _extract_urls_from_email(self, email_body: str) -> dict | None:
         """
         Extracts URLs from an email body using regex pattern matching.
@@ -393,13 +577,13 @@ class Emails(BaseDB):
         - Add option to deduplicate URLs
         - Support extracting URL metadata (title, domain, etc)
         """
-        import re
-
-        # Regular expression pattern to match URLs
-        url_pattern = r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
+        # Every match contains "http"; the substring search is much cheaper
+        # than running the regex over a long body that has no links
+        if "http" not in email_body:
+            return None
 
         # Find all matches of the URL pattern in the email body
-        urls = re.findall(url_pattern, email_body)
+        urls = URL_RE.findall(email_body)
 
         if not urls:
             return None
@@ -407,25 +591,62 @@ class Emails(BaseDB):
         # Return a dictionary with the "urls" key and the list of URLs as the value
         return {"urls": urls}
 
-    def _check_existing_email(self, email_data: dict) -> dict | None:
+    @staticmethod
+    def _content_hash(email_data: dict) -> str:
         """
-        Checks if an email already exists in the database with the same sender, date and content.
+        Hashes an email's sender, date and content for duplicate detection.
 
         Args:
             email_data (dict): Dictionary containing email data with sender, date and content
 
         Returns:
-            dict | None: The existing email record if found, None otherwise
-        """
-        return self.supabase.select_from_table(
-            "emails",
-            ["email_id"],
-            [
-                ("sender", "eq", email_data["sender"]),
-                ("date", "eq", email_data["date"]),
-                ("content", "eq", email_data["content"]),
-            ],
-        )
+            str: Hex SHA-256 digest, matching the content_hash column backfill
+
+        The date is taken in UTC to the second, so the same message always
+        hashes alike while a body resent on another day does not.
+        """
+        date = email_data["date"]
+        if date.tzinfo is None:  # parsedate_to_datetime gives naive for -0000
+            date = date.replace(tzinfo=timezone.utc)
+        utc_date = date.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        key = f"{email_data['sender']}\n{utc_date}\n{email_data['content']}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _drop_existing_emails(self, new_emails: list) -> list:
+        """
+        Removes emails that are already stored, or repeated within the batch.
+
+        Args:
+            new_emails (list): (email_data, to_recipients_str) pairs
+
+        Returns:
+            list: The pairs not yet in the database, each email_data with its content_hash set
+
+        Looks the hashes up HASH_LOOKUP_BATCH_SIZE at a time with an "in" filter,
+        rather than one query per email comparing whole bodies.
+        """
+        for email_data, _ in new_emails:
+            email_data["content_hash"] = self._content_hash(email_data)
+
+        hashes = list({email_data["content_hash"] for email_data, _ in new_emails})
+        seen = set()
+        for start in range(0, len(hashes), self.HASH_LOOKUP_BATCH_SIZE):
+            batch = hashes[start : start + self.HASH_LOOKUP_BATCH_SIZE]
+            rows = self.supabase.select_from_table_sync(
+                "emails", ["content_hash"], [("content_hash", "in", batch)]
+            )
+            seen.update(row["content_hash"] for row in rows)
+
+        kept = []
+        for email_data, to_recipients_str in new_emails:
+            if email_data["content_hash"] in seen:
+                self.logger.info(
+                    f"Skipping duplicate email from {email_data['sender']} on {email_data['date']}"
+                )
+                continue
+            seen.add(email_data["content_hash"])
+            kept.append((email_data, to_recipients_str))
+        return kept
 
     def _insert_email(
         self, email_data: dict | list, to_recipients_str: str = None
@@ -434,7 +655,7 @@ class Emails(BaseDB):
         Inserts one or more email records into the database using Supabase.
 
         Args:
-            email_data (dict | list): Single dictionary or list of dictionaries containing email data
+            email_data (dict | list): Single dictionary of email data, or list of rows built with _email_row
             to_recipients_str (str, optional): Comma-separated string of recipient emails, only used for single records
 
         Returns:
@@ -442,24 +663,105 @@ class Emails(BaseDB):
         """
         if isinstance(email_data, dict):
             # Handle single record
-            data = {
-                "date": email_data["date"],
-                "sender": email_data["sender"],
-                "subject": email_data["subject"],
-                "to_recipients": to_recipients_str,
-                "content": email_data["content"],
-                "attachment_cnt": len(email_data["attachments"]),
-                "url_cnt": len(email_data["urls"]["urls"]),
-                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            }
-        else:
-            # Handle multiple records
-            data = email_data
+            data = self._email_row(email_data, to_recipients_str)
+            # insert_into_table returns the inserted record itself
+            result = self.supabase.insert_into_table_sync("emails", data)
+            return result["id"] if result else None
 
-        result = self.supabase.insert_into_table("emails", data)
-        if isinstance(email_data, dict):
-            return result[0]["id"] if result else None
-        return [record["id"] for record in result] if result else []
+        # Handle multiple records, already built with _email_row
+        result = self.supabase.insert_many_sync("emails", email_data)
+        return [record["id"] for record in result]
+
+    def _email_row(self, email_data: dict, to_recipients_str: str) -> dict:
+        """
+        Builds the emails table row for one parsed email.
+
+        Args:
+            email_data (dict): Parsed email as built by extract_recent_emails
+            to_recipients_str (str): Comma-separated string of recipient emails
+
+        Returns:
+            dict: Column values for the emails table
+        """
+        return {
+            # httpx's json= can't encode datetimes
+            "date": email_data["date"].isoformat(),
+            "sender": email_data["sender"],
+            "subject": email_data["subject"],
+            "to_recipients": to_recipients_str,
+            "content": email_data["content"],
+            "attachment_cnt": len(email_data["attachments"]),
+            "url_cnt": len(email_data["urls"]["urls"]),
+            "content_hash": email_data.get("content_hash") or self._content_hash(email_data),
+        }
+
+    def _db_worker(self, store_queue: queue.Queue, errors: list) -> None:
+        """
+        Drains parsed emails from the queue into the database in batches.
+
+        Args:
+            store_queue (queue.Queue): (email_data, to_recipients_str) pairs, ended by None
+            errors (list): Receives the exception of each batch that failed
+
+        Runs on its own thread during extract_recent_emails. Every
+        STORE_BATCH_SIZE emails, and once more at the end, the batch is
+        checked for duplicates and stored. A failed batch is not stored,
+        and its error goes into errors for the caller to raise. The queue
+        keeps draining either way, so the producer never blocks on it.
+        """
+        batch = []
+        while True:
+            item = store_queue.get()
+            if item is not None:
+                batch.append(item)
+                if len(batch) < self.STORE_BATCH_SIZE:
+                    continue
+            if batch:
+                try:
+                    self._store_emails(self._drop_existing_emails(batch))
+                except Exception as e:
+                    self.logger.error(
+                        f"Error storing {len(batch)} emails in the database: {e}"
+                    )
+                    errors.append(e)
+                batch = []
+            if item is None:
+                return
+
+    def _store_emails(self, new_emails: list) -> None:
+        """
+        Writes emails with their attachments and URLs, one bulk insert per table.
+
+        Args:
+            new_emails (list): (email_data, to_recipients_str) pairs to store
+
+        The emails go in first so their generated ids can be attached to the
+        attachment and URL rows. Three requests in total, however many
+        emails, attachments and URLs there are.
+        """
+        if not new_emails:
+            return
+
+        email_ids = self._insert_email(
+            [self._email_row(data, recipients) for data, recipients in new_emails]
+        )
+
+        attachment_email_ids, filenames, sizes = [], [], []
+        url_email_ids, urls = [], []
+        for email_id, (email_data, _) in zip(email_ids, new_emails):
+            for attachment in email_data["attachments"]:
+                attachment_email_ids.append(email_id)
+                # Strip leading "-" or " " from the filename
+                filenames.append(attachment["filename"].lstrip("- "))
+                sizes.append(attachment["size"])
+            for url in email_data["urls"]["urls"]:
+                url_email_ids.append(email_id)
+                urls.append(url)
+
+        if attachment_email_ids:
+            self._insert_attachment(attachment_email_ids, filenames, sizes)
+        if url_email_ids:
+            self._insert_url(url_email_ids, urls)
 
     def _insert_attachment(
         self, email_id: int | list, cleaned_filename: str | list, size: int | list
@@ -481,7 +783,6 @@ class Emails(BaseDB):
                 "email_id": email_id,
                 "filename": cleaned_filename,
                 "size": size,
-                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             }
         else:
             # Handle multiple records
@@ -490,15 +791,15 @@ class Emails(BaseDB):
                     "email_id": eid,
                     "filename": fname,
                     "size": s,
-                    "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 }
                 for eid, fname, s in zip(email_id, cleaned_filename, size)
             ]
 
-        result = self.supabase.insert_into_table("attachments", data)
         if isinstance(email_id, int):
-            return result[0]["id"] if result else None
-        return [record["id"] for record in result] if result else []
+            result = self.supabase.insert_into_table_sync("attachments", data)
+            return result["id"] if result else None
+        result = self.supabase.insert_many_sync("attachments", data)
+        return [record["id"] for record in result]
 
     def _insert_url(self, email_id: int | list, url: str | list) -> int | list:
         """
@@ -516,7 +817,6 @@ class Emails(BaseDB):
             data = {
                 "email_id": email_id,
                 "url": url,
-                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             }
         else:
             # Handle multiple records
@@ -524,26 +824,26 @@ class Emails(BaseDB):
                 {
                     "email_id": eid,
                     "url": u,
-                    "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 }
                 for eid, u in zip(email_id, url)
             ]
 
-        result = self.supabase.insert_into_table("all_email_urls", data)
         if isinstance(email_id, int):
-            return result[0]["id"] if result else None
-        return [record["id"] for record in result] if result else []
+            result = self.supabase.insert_into_table_sync("all_email_urls", data)
+            return result["id"] if result else None
+        result = self.supabase.insert_many_sync("all_email_urls", data)
+        return [record["id"] for record in result]
 
    
 
 
 if __name__ == "__main__":
-    load_dotenv()
+    ensure_env_loaded()
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
-    supabase = SupabaseService(url, key)
-    email = os.getenv("TEST_EMAIL")
+    supabase = get_supabase(url, key)
+    test_email = os.getenv("TEST_EMAIL")
     password = os.getenv("TEST_PASSWORD")
-    supabase.login(email, password)
+    supabase.login(test_email, password)
     emails = Emails(supabase)
     emails.import_csv_in_batches("file_types/csvs/emails.csv")
@@ -1,7 +1,6 @@
 import os
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
 import asyncio
 from typing import Dict, Any, Optional, List
 from datetime import datetime
@@ -11,6 +10,7 @@ project_root = str(Path(__file__).parent.parent.parent)
 sys.path.append(project_root)
 
 from src.db.base_db import BaseDB, ValidationError, RecordNotFoundError, DatabaseError
+from src.services.env import ensure_env_loaded
 from src.services.supabase_service import SupabaseService
 
 
@@ -364,7 +364,7 @@ class Experts(BaseDB[Dict[str, Any]]):
 
 
 async def test_crud_operations():
-    load_dotenv()
+    ensure_env_loaded()
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     email = os.getenv("TEST_EMAIL")
@@ -382,110 +382,3 @@ async def test_crud_operations():
 
 if __name__ == "__main__":
     asyncio.run(test_crud_operations())
-
-
-def main():
-    """Test the Supabase service."""
-    load_dotenv()
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
-    supabase = SupabaseService(url, key)
-    email = os.getenv("TEST_EMAIL")
-    password = os.getenv("TEST_PASSWORD")
-    supabase.login(email, password)
-    # Then create the service with the client
-    todos = supabase.get_todos()
-    if todos:
-        print(f"Found {len(todos.data)} todos")
-    else:
-        print("No todos found or error occurred")
-
-    users = supabase.get_test_users()
-    if users:
-        print(f"Found {len(users.data)} users")
-    else:
-        print("No users found or error occurred")
-
-
-def update_document_type_description():
-    load_dotenv()
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
-    supabase = SupabaseService(url, key)
-    email = os.getenv("TEST_EMAIL")
-    password = os.getenv("TEST_PASSWORD")
-    supabase.login(email, password)
-
-    try:
-        response = supabase.update_table(
-            "uni_document_types",
-            {"description": "includes master's thesis"},
-            [("document_type", "eq", "thesis")],
-        )
-        if response.status_code == 200:
-            print("Document type description updated successfully.")
-        else:
-            print(
-                f"Failed to update document type description. Status code: {response.status_code}"
-            )
-    except Exception as e:
-        print(f"Error updating document type description: {str(e)}")
-
-
-def insert_test():
-    load_dotenv()
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
-    supabase = SupabaseService(url, key)
-    email = os.getenv("TEST_EMAIL")
-    password = os.getenv("TEST_PASSWORD")
-    supabase.login(email, password)
-
-    new_expert = {
-        "expert_name": "John Doe",
-        "full_name": "Johnathan Doe",
-        "starting_ref_id": 123,
-        "expertise_area": "AI",
-        "experience_years": 5,
-        "user_id": "f5972054-059e-4b1e-915e-268bcdcc94b9",
-    }
-    try:
-        response = supabase.insert_into_table("experts", new_expert)
-        if response:  # If we got back a dict with the inserted data
-            print("New expert inserted successfully.")
-            print(f"Inserted expert data: {response}")
-        else:
-            print("Failed to insert new expert.")
-    except Exception as e:
-        print(f"Error inserting new expert: {str(e)}")
-
-
-def select_from_table():
-    load_dotenv()
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
-    supabase = SupabaseService(url, key)
-    email = os.getenv("TEST_EMAIL")
-    password = os.getenv("TEST_PASSWORD")
-    supabase.login(email, password)
-    data = supabase.select_from_table(
-        "uni_document_types",
-        [
-            "document_type",
-            "description",
-            "is_ai_generated",
-            "mime_type",
-            "file_extension",
-            "category",
-        ],
-        [("is_active", "eq", True)],
-    )
-    print(data)
-    fields = "*"
-    expert_id = "34acaa61-7fb4-4c02-b463-a55128e354f3"
-    data = supabase.select_from_table(
-        "experts",
-        fields,
-        [("id", "eq", expert_id)],
-    )
-    print(data)
@@ -1,12 +1,12 @@
 import os
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
 
 # Add the project root directory to Python path
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.append(project_root)
 
+from src.services.env import ensure_env_loaded
 from src.services.supabase_service import SupabaseService
 
 
@@ -39,7 +39,7 @@ class LionyaEmails:
 
 
 if __name__ == "__main__":
-    load_dotenv()
+    ensure_env_loaded()
     supabase_url = os.getenv("SUPABASE_URL")
     supabase_key = os.getenv("SUPABASE_KEY")
     supabase_client = SupabaseService(supabase_url, supabase_key)
@@ -3,15 +3,19 @@ import sys
 import sqlite3
 from datetime import datetime
 import os
-from dotenv import load_dotenv
+from functools import lru_cache
 
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.append(project_root)
 
+from src.services.env import ensure_env_loaded
 from src.services.supabase_service import SupabaseService
 
 
+@lru_cache(maxsize=1)
 def get_supabase_client():
+    """Logged-in Supabase client, built once and shared by every migration step."""
+    ensure_env_loaded()
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     supabase = SupabaseService(url, key)
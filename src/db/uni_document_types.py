@@ -1,7 +1,6 @@
 import os
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
 import asyncio
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
@@ -10,6 +9,7 @@ from typing import Dict, Any, Optional, List, Tuple
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.append(project_root)
 
+from src.services.env import ensure_env_loaded
 from src.services.supabase_service import SupabaseService
 from src.db.base_db import BaseDB, ValidationError, RecordNotFoundError, DatabaseError
 
@@ -443,7 +443,7 @@ class DocumentTypes(BaseDB[Dict[str, Any]]):
 
 
 async def test_crud_operations():
-    load_dotenv()
+    ensure_env_loaded()
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     email = os.getenv("TEST_EMAIL")
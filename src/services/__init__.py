@@ -0,0 +1,31 @@
+"""Service clients, loaded lazily (PEP 562).
+
+`from src.services import SupabaseService` imports only the module that
+defines it, so pages that need one client don't pay for the Google,
+Supabase and Anthropic SDK import trees all at once.
+"""
+
+import importlib
+
+_LAZY = {
+    "AnthropicService": ".support_claude",
+    "AsyncDatabasePool": ".database_pool",
+    "GoogleDriveService": ".google_drive",
+    "GooglePyDrive2": ".google_pydrive2",
+    "ParallelClaudeProcessor": ".claude_parallel",
+    "SupabaseService": ".supabase_service",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import List, Optional
+
+import anthropic
+
+from src.services.support_claude import AnthropicService
+
+logger = logging.getLogger(__name__)
+
+
+class ParallelClaudeProcessor:
+    """Runs many basic Claude calls concurrently inside per-minute budgets.
+
+    Requests and input tokens are drawn from two buckets that refill
+    continuously at requests_per_minute/60 and tokens_per_minute/60 per
+    second, so a bulk job runs as fast as the account's limits allow
+    without tripping them. If a 429 gets through anyway, every task pauses
+    for the server's Retry-After before trying again.
+    """
+
+    MAX_ATTEMPTS = 5
+    CHARS_PER_TOKEN = 4  # rough, but close enough for budgeting
+
+    def __init__(
+        self,
+        service: AnthropicService,
+        requests_per_minute: int = 50,
+        tokens_per_minute: int = 40_000,
+    ):
+        self.service = service
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_capacity = float(requests_per_minute)
+        self._token_capacity = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._locks = {}  # event loop -> asyncio.Lock
+        self._locks_lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._request_capacity = min(
+            self.requests_per_minute,
+            self._request_capacity + elapsed * self.requests_per_minute / 60,
+        )
+        self._token_capacity = min(
+            self.tokens_per_minute,
+            self._token_capacity + elapsed * self.tokens_per_minute / 60,
+        )
+
+    def _loop_lock(self) -> asyncio.Lock:
+        """The bucket lock for the running event loop.
+
+        Overlapping runs on one loop share it. An asyncio.Lock stays bound
+        to the first loop that waits on it, so a later asyncio.run() gets
+        its own; locks of loops that have since closed are dropped.
+        """
+        loop = asyncio.get_running_loop()
+        with self._locks_lock:
+            for closed in [l for l in self._locks if l.is_closed()]:
+                del self._locks[closed]
+            return self._locks.setdefault(loop, asyncio.Lock())
+
+    async def _acquire(self, tokens: int) -> None:
+        """Wait until one request and `tokens` input tokens are available."""
+        # A prompt bigger than the whole budget goes out once the bucket is full
+        tokens = min(tokens, self.tokens_per_minute)
+        # Held while sleeping, so waiting tasks are served in arrival order
+        async with self._loop_lock():
+            while True:
+                self._refill()
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0:
+                    if self._request_capacity >= 1 and self._token_capacity >= tokens:
+                        self._request_capacity -= 1
+                        self._token_capacity -= tokens
+                        return
+                    wait = max(
+                        (1 - self._request_capacity) * 60 / self.requests_per_minute,
+                        (tokens - self._token_capacity) * 60 / self.tokens_per_minute,
+                    )
+                await asyncio.sleep(wait)
+
+    @staticmethod
+    def _retry_after(error: anthropic.RateLimitError) -> Optional[float]:
+        try:
+            return float(error.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    async def _call(self, max_tokens: int, input_string: str, system_string: str) -> str:
+        tokens = (len(system_string) + len(input_string)) // self.CHARS_PER_TOKEN
+        for attempt in range(self.MAX_ATTEMPTS):
+            await self._acquire(tokens)
+            try:
+                return await self.service.call_claude_basic_async(
+                    max_tokens, input_string, system_string
+                )
+            except anthropic.RateLimitError as e:
+                if attempt == self.MAX_ATTEMPTS - 1:
+                    raise
+                delay = self._retry_after(e) or 2**attempt
+                logger.warning("Rate limited, pausing all requests for %.1fs", delay)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    async def run(
+        self, max_tokens: int, input_strings, system_string: str
+    ) -> List[str]:
+        """Send one basic call per input; results keep input order.
+
+        Safe to call again under a new asyncio.run(): the service hands
+        out an AsyncAnthropic client per loop, and a client created for
+        this run is closed when it ends.
+        """
+        owns_client = not self.service.has_async_client()
+        try:
+            return await asyncio.gather(
+                *(
+                    self._call(max_tokens, input_string, system_string)
+                    for input_string in input_strings
+                )
+            )
+        finally:
+            if owns_client:
+                await self.service.aclose_async_client()
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from typing import Any, Dict, List
+
+import asyncpg
+
+from src.services.base_logging import Logger
+from src.services.exceptions import SupabaseConnectionError, SupabaseQueryError
+
+
+class AsyncDatabasePool:
+    """Pooled, direct Postgres connection for hot read paths.
+
+    Skips PostgREST's HTTP round-trip and JSON encoding by talking to the
+    database with asyncpg. The pool lives on its own event loop thread so
+    synchronous Streamlit code can share it through fetch_sync().
+
+    Note: connects as the DSN's role, so row level security does not apply
+    the way it does for requests made through SupabaseService.
+    """
+
+    MIN_SIZE = 10
+    MAX_SIZE = 50
+    MAX_INACTIVE_CONNECTION_LIFETIME = 300  # seconds
+    COMMAND_TIMEOUT = 30  # seconds
+    APPLICATION_NAME = "dhg-viewer"  # shows up in pg_stat_activity
+
+    def __init__(self, dsn: str):
+        if not dsn:
+            raise SupabaseConnectionError("Database DSN is required")
+        self.dsn = dsn
+        self._logger = Logger(self.__class__.__name__)
+        self._pool = None
+        self._pool_lock = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="db-pool-loop", daemon=True
+        )
+        self._thread.start()
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    try:
+                        self._pool = await asyncpg.create_pool(
+                            self.dsn,
+                            min_size=self.MIN_SIZE,
+                            max_size=self.MAX_SIZE,
+                            max_inactive_connection_lifetime=self.MAX_INACTIVE_CONNECTION_LIFETIME,
+                            command_timeout=self.COMMAND_TIMEOUT,
+                            # Supavisor in transaction mode hands each statement
+                            # to any backend, so prepared statements cached on one
+                            # connection are missing on the next. Keep none.
+                            statement_cache_size=0,
+                            server_settings={"application_name": self.APPLICATION_NAME},
+                        )
+                    except Exception as e:
+                        raise SupabaseConnectionError(
+                            "Failed to create database pool", original_error=e
+                        ) from e
+        return self._pool
+
+    async def fetch(self, sql: str, *params: Any) -> List[Dict[str, Any]]:
+        """Run a query and return its rows as dicts.
+
+        Must be awaited on the pool's own loop; use fetch_sync() elsewhere.
+        """
+        pool = await self._get_pool()
+        try:
+            async with pool.acquire() as connection:
+                rows = await connection.fetch(sql, *params)
+        except Exception as e:
+            raise SupabaseQueryError(f"Failed to run query: {sql}", original_error=e)
+        return [dict(row) for row in rows]
+
+    def fetch_sync(self, sql: str, *params: Any) -> List[Dict[str, Any]]:
+        """Run fetch() on the pool's loop thread and wait for the rows."""
+        return asyncio.run_coroutine_threadsafe(
+            self.fetch(sql, *params), self._loop
+        ).result()
+
+    def close(self) -> None:
+        """Close the pool and stop its loop thread."""
+        if self._pool is not None:
+            asyncio.run_coroutine_threadsafe(self._pool.close(), self._loop).result()
+            self._pool = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,13 @@
+from functools import cache
+
+from dotenv import load_dotenv
+
+
+@cache
+def ensure_env_loaded():
+    """Load .env into os.environ once per process.
+
+    Later calls are free, so every entry point can call this instead of
+    re-reading and re-parsing the file with load_dotenv().
+    """
+    load_dotenv(override=False)
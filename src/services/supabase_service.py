@@ -1,13 +1,10 @@
 from supabase import AsyncClient, create_client
 import asyncio
-from pathlib import Path
-import sys
+import httpx
+import threading
 
-project_root = str(Path(__file__).parent.parent.parent)
-sys.path.append(project_root)
-
-from src.services.base_logging import Logger, log_method
-from src.services.exceptions import (
+from .base_logging import Logger, log_method
+from .exceptions import (
     SupabaseConnectionError,
     SupabaseQueryError,
     SupabaseAuthenticationError,
@@ -17,36 +14,58 @@ from src.services.exceptions import (
     map_storage_error,
 )
 from functools import wraps
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future
 from typing import Any, Optional, Callable, List, Dict, Tuple, Union
 from tenacity import retry, stop_after_attempt, wait_exponential
-from supabase.lib.client_options import ClientOptions
-from gotrue.errors import AuthApiError
-from gotrue import AsyncMemoryStorage, SyncMemoryStorage, AsyncGoTrueClient
+from supabase.lib.client_options import AsyncClientOptions
+from supabase_auth.errors import AuthApiError
+from supabase_auth import AsyncMemoryStorage, SyncMemoryStorage, AsyncGoTrueClient
+
+
+_service_loop = None
+_service_loop_lock = threading.Lock()
+
+
+def get_service_loop() -> asyncio.AbstractEventLoop:
+    """Event loop, on its own daemon thread, that runs every *_sync call.
+
+    httpx and the auth client bind their connections and timers to the
+    loop that first uses them. Running all sync calls here keeps each
+    client on one loop, whichever thread (a Streamlit rerun, a worker
+    pool) makes the call.
+    """
+    global _service_loop
+    with _service_loop_lock:
+        if _service_loop is None:
+            _service_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_service_loop.run_forever, name="supabase-loop", daemon=True
+            ).start()
+    return _service_loop
 
 
 def make_sync(async_func):
-    """Decorator to convert async methods to sync methods."""
+    """Decorator to convert async methods to sync methods.
+
+    The coroutine runs on get_service_loop() and the calling thread waits
+    for its result, so concurrent callers share that loop's connections.
+    """
 
     @wraps(async_func)
     def sync_wrapper(*args, **kwargs):
+        loop = get_service_loop()
         try:
-            loop = asyncio.get_event_loop()
+            running = asyncio.get_running_loop()
         except RuntimeError:
-            # If no event loop exists, create a new one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        if loop.is_running():
-            # If we're in a running event loop, use a thread
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(
-                    lambda: asyncio.run(async_func(*args, **kwargs))
-                )
-                return future.result()
-        else:
-            # If no loop is running, we can just run it directly
-            return loop.run_until_complete(async_func(*args, **kwargs))
+            running = None
+        if running is loop:
+            # Waiting here would block the loop the coroutine needs
+            raise RuntimeError(
+                f"{async_func.__name__} called on the service loop; await the async method"
+            )
+        return asyncio.run_coroutine_threadsafe(
+            async_func(*args, **kwargs), loop
+        ).result()
 
     return sync_wrapper
 
@@ -57,6 +76,10 @@ class SupabaseService:
     Provides methods for database operations, authentication, storage,
     and realtime subscriptions.
 
+    The clients bind to the first event loop that uses them. Use the
+    *_sync methods, which all run on get_service_loop(), or await the async
+    methods from that loop or from one loop of your own, never from both.
+
     Attributes:
         url (str): Supabase project URL
         api_key (str): Supabase API key
@@ -64,6 +87,10 @@ class SupabaseService:
 
     DEFAULT_TIMEOUT = 30  # seconds
     MAX_RETRIES = 3
+    MAX_CONNECTIONS = 120  # shared across Streamlit sessions
+    MAX_KEEPALIVE_CONNECTIONS = 80
+    KEEPALIVE_EXPIRY = 30  # seconds
+    CONNECT_RETRIES = 2  # transport-level retries for stale sockets
     CHUNK_SIZE = 1000  # for bulk operations
     STORAGE_UPLOAD_LIMIT = 50 * 1024 * 1024  # 50MB
     ALLOWED_OPERATORS = [
@@ -88,18 +115,40 @@ class SupabaseService:
         self.url = url
         self.api_key = api_key
         self._logger = Logger(self.__class__.__name__)
+        self.session = None  # set by login(), cleared by logout()
+        # Identical selects already running, shared with concurrent callers.
+        # concurrent.futures.Future so *_sync callers on other loops can wait.
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
         self._init_client()
 
     @log_method()
     def _init_client(self) -> None:
         """Initialize the Supabase async client."""
         try:
-            options = ClientOptions(
+            # One pooled transport shared by PostgREST and auth requests;
+            # HTTP/2 lets concurrent requests share a connection
+            limits = httpx.Limits(
+                max_connections=self.MAX_CONNECTIONS,
+                max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=self.KEEPALIVE_EXPIRY,
+            )
+            self._http_client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(
+                    limits=limits, retries=self.CONNECT_RETRIES, http2=True
+                ),
+                timeout=self.DEFAULT_TIMEOUT,
+                event_hooks={"response": [self._raise_on_rate_limit]},
+            )
+
+            # Only the async options take an httpx_client
+            options = AsyncClientOptions(
                 schema="public",
                 headers={"x-my-custom-header": "my-app-name"},
                 persist_session=True,
                 auto_refresh_token=True,
                 postgrest_client_timeout=self.DEFAULT_TIMEOUT,
+                httpx_client=self._http_client,
             )
 
             # Create the client
@@ -116,10 +165,14 @@ class SupabaseService:
                 url=f"{self.url}/auth/v1",
                 headers={"apikey": self.api_key},
                 storage=storage,
+                http_client=self._http_client,
             )
             client.auth = auth_client
 
             self._supabase = client
+            # Replacing client.auth drops supabase-py's own listener, so
+            # PostgREST would keep sending the anon key after sign-in.
+            auth_client.on_auth_state_change(self._on_auth_state_change)
 
             # Add detailed debugging
             self._logger.debug(f"""
@@ -138,6 +191,28 @@ class SupabaseService:
                 "Failed to initialize client", original_error=e
             )
 
+    @staticmethod
+    async def _raise_on_rate_limit(response: httpx.Response) -> None:
+        """Raise httpx.HTTPStatusError for a PostgREST 429.
+
+        postgrest-py only reports the HTTP status when the error body is
+        not JSON, so callers could not reliably tell a rate limit apart.
+        The status error ends up as SupabaseQueryError.original_error.
+        """
+        if response.status_code == 429 and "/rest/v1/" in response.request.url.path:
+            response.raise_for_status()
+
+    def _on_auth_state_change(self, event, session) -> None:
+        """Set the PostgREST bearer token once per sign-in, refresh or sign-out.
+
+        The token lives on the shared PostgREST session, so individual
+        queries never have to pass an Authorization header themselves.
+        """
+        if event in ("SIGNED_IN", "TOKEN_REFRESHED") and session:
+            self._supabase.postgrest.auth(session.access_token)
+        elif event == "SIGNED_OUT":
+            self._supabase.postgrest.auth(self.api_key)
+
     @property
     def supabase(self) -> AsyncClient:
         """Get the Supabase client instance.
@@ -161,75 +236,156 @@ class SupabaseService:
         table_name: str,
         fields: Union[dict, str],
         where_filters: Optional[List[Tuple[str, str, Any]]] = None,
+        limit: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """Query data from a Supabase table with optional filters.
 
+        Concurrent calls with the same arguments share a single request;
+        each caller gets its own copy of the rows, so mutating them is safe.
+
         Args:
             table_name: Name of the table to query
-            fields: Dictionary of fields to select or "*" for all fields
+            fields: Column names to select (dict keys or a list) or "*" for all fields
             where_filters: Optional list of filters in format [(column, operator, value)]
+            limit: Optional maximum number of rows to return
 
         Returns:
-            list | None: List of matching records or None if no matches/error
+            list: Matching records, empty when nothing matches
         """
         if not isinstance(table_name, str) or not table_name.strip():
             raise ValueError("Table name must be a non-empty string")
 
-        if not isinstance(fields, (dict, str)):
-            raise ValueError("Fields must be either a dictionary or string")
+        if not isinstance(fields, (dict, str, list, tuple)):
+            raise ValueError("Fields must be a dictionary, string, or list of column names")
 
         if where_filters and not all(
             isinstance(f, tuple) and len(f) == 3 for f in where_filters
         ):
             raise ValueError("Invalid where_filters format")
 
+        # Coalesce identical concurrent selects into one PostgREST request
+        key = (table_name, repr(fields), repr(where_filters), limit)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_owner:
+            # The owner keeps the original rows; copy them for everyone else
+            result = await asyncio.wrap_future(future)
+            return [dict(row) for row in result]
+
+        try:
+            result = await self._select_from_table(
+                table_name, fields, where_filters, limit
+            )
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    @staticmethod
+    def _apply_filters(query, where_filters: Optional[List[Tuple[str, str, Any]]]):
+        """Add each (column, operator, value) filter to a PostgREST query."""
+        for filter in where_filters:
+            column, operator, value = filter
+            if operator == "eq":
+                query = query.eq(column, value)
+            elif operator == "neq":
+                query = query.neq(column, value)
+            elif operator == "lt":
+                query = query.lt(column, value)
+            elif operator == "lte":
+                query = query.lte(column, value)
+            elif operator == "gt":
+                query = query.gt(column, value)
+            elif operator == "gte":
+                query = query.gte(column, value)
+            elif operator == "like":
+                query = query.like(column, value)
+            elif operator == "ilike":
+                query = query.ilike(column, value)
+            elif operator == "is":
+                query = query.is_(column, value)
+            elif operator == "in":
+                query = query.in_(column, value)
+            elif operator == "contains":
+                query = query.contains(column, value)
+            elif operator == "contained_by":
+                query = query.contained_by(column, value)
+            elif operator == "text_search":
+                query = query.text_search(column, value)
+            else:
+                raise ValueError(f"Unsupported operator: {operator}")
+        return query
+
+    async def _select_from_table(
+        self,
+        table_name: str,
+        fields: Union[dict, str],
+        where_filters: Optional[List[Tuple[str, str, Any]]],
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Run a validated select against PostgREST."""
         try:
             if fields == "*":
                 query = self.supabase.table(table_name).select("*")
             else:
                 query = self.supabase.table(table_name).select(",".join(fields))
+            if where_filters:
+                query = self._apply_filters(query, where_filters)
 
-                if where_filters:
-                    for filter in where_filters:
-                        column, operator, value = filter
-                        if operator == "eq":
-                            query = query.eq(column, value)
-                        elif operator == "neq":
-                            query = query.neq(column, value)
-                        elif operator == "lt":
-                            query = query.lt(column, value)
-                        elif operator == "lte":
-                            query = query.lte(column, value)
-                        elif operator == "gt":
-                            query = query.gt(column, value)
-                        elif operator == "gte":
-                            query = query.gte(column, value)
-                        elif operator == "like":
-                            query = query.like(column, value)
-                        elif operator == "ilike":
-                            query = query.ilike(column, value)
-                        elif operator == "is":
-                            query = query.is_(column, value)
-                        elif operator == "in":
-                            query = query.in_(column, value)
-                        elif operator == "contains":
-                            query = query.contains(column, value)
-                        elif operator == "contained_by":
-                            query = query.contained_by(column, value)
-                        elif operator == "text_search":
-                            query = query.text_search(column, value)
-                        else:
-                            raise ValueError(f"Unsupported operator: {operator}")
+            if limit is not None:
+                query = query.limit(limit)
 
             response = await query.execute()
-            if not response or not hasattr(response, "data"):
-                return None
-            return response.data
+            return getattr(response, "data", None) or []
         except Exception as e:
             raise SupabaseQueryError(
                 f"Failed to select from table {table_name}", original_error=e
             )
 
+    @log_method()
+    async def count_rows(
+        self,
+        table_name: str,
+        where_filters: Optional[List[Tuple[str, str, Any]]] = None,
+    ) -> int:
+        """Count the rows of a table matching the given filters.
+
+        Sends a HEAD request with count=exact, so PostgREST returns only
+        the count in its Content-Range header and no rows.
+
+        Args:
+            table_name: Name of the table to count
+            where_filters: Optional list of filters in format [(column, operator, value)]
+
+        Returns:
+            int: Number of matching rows
+        """
+        if not isinstance(table_name, str) or not table_name.strip():
+            raise ValueError("Table name must be a non-empty string")
+
+        try:
+            query = self.supabase.table(table_name).select(
+                "*", count="exact", head=True
+            )
+            if where_filters:
+                query = self._apply_filters(query, where_filters)
+            response = await query.execute()
+            return response.count or 0
+        except Exception as e:
+            raise SupabaseQueryError(
+                f"Failed to count rows in table {table_name}", original_error=e
+            )
+
     @log_method()
     async def update_table(
         self, table_name: str, update_fields: dict, where_filters: list
@@ -322,6 +478,28 @@ class SupabaseService:
         except Exception as e:
             raise SupabaseQueryError("Failed to insert into table", original_error=e)
 
+    @log_method()
+    async def insert_many(
+        self, table_name: str, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Insert several records in one request.
+
+        Args:
+            table_name: Name of the table for insertion
+            rows: List of dictionaries of fields and values to insert
+
+        Returns:
+            list: Every inserted record, empty if nothing was inserted
+        """
+        if not table_name:
+            raise SupabaseError("Table name is required")
+
+        try:
+            response = await self.supabase.table(table_name).insert(rows).execute()
+            return response.data or []
+        except Exception as e:
+            raise SupabaseQueryError("Failed to insert into table", original_error=e)
+
     @log_method()
     async def delete_from_table(self, table_name: str, where_filters: list) -> bool:
         """Delete records from a table matching the given filters.
@@ -708,14 +886,18 @@ class SupabaseService:
             )
 
     @log_method()
-    async def refresh_session(self) -> dict:
+    async def refresh_session(self, refresh_token: Optional[str] = None) -> dict:
         """Refresh the current session token.
 
+        Args:
+            refresh_token: Token to refresh with instead of the client's own
+                session, e.g. one kept in Streamlit session state
+
         Returns:
             dict: New session data
         """
         try:
-            response = await self.supabase.auth.refresh_session()
+            response = await self.supabase.auth.refresh_session(refresh_token)
             return response
         except Exception as e:
             raise SupabaseAuthenticationError(
@@ -1136,6 +1318,10 @@ class SupabaseService:
     async def select_from_table_sync(self, *args, **kwargs):
         return await self.select_from_table(*args, **kwargs)
 
+    @make_sync
+    async def count_rows_sync(self, *args, **kwargs):
+        return await self.count_rows(*args, **kwargs)
+
     @make_sync
     async def update_table_sync(self, *args, **kwargs):
         return await self.update_table(*args, **kwargs)
@@ -1144,6 +1330,10 @@ class SupabaseService:
     async def insert_into_table_sync(self, *args, **kwargs):
         return await self.insert_into_table(*args, **kwargs)
 
+    @make_sync
+    async def insert_many_sync(self, *args, **kwargs):
+        return await self.insert_many(*args, **kwargs)
+
     @make_sync
     async def delete_from_table_sync(self, *args, **kwargs):
         return await self.delete_from_table(*args, **kwargs)
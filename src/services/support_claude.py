@@ -1,11 +1,30 @@
 # import sys
 
 # sys.path.append("src")
+import asyncio
+import hashlib
+import json
+import logging
 import os
-from anthropic import Anthropic
-import dotenv
-
-dotenv.load_dotenv()
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+import httpx
+from anthropic import Anthropic, APIError, AsyncAnthropic
+from src.services.env import ensure_env_loaded
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
+def _count_system_tokens(client, model: str, system_string: str) -> int:
+    """Input tokens for a system prompt, counted once per client, model and prompt."""
+    return client.messages.count_tokens(
+        model=model,
+        system=system_string,
+        messages=[{"role": "user", "content": "."}],
+    ).input_tokens
 
 """ INSTRUCTIONS
 
@@ -87,13 +106,75 @@ This module does not contain unused or duplicate functions. All listed functions
 
 
 class AnthropicService:
+    MAX_CONNECTIONS = 20  # concurrent requests per client
+    MAX_KEEPALIVE_CONNECTIONS = 10
+    TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+    # Anthropic won't cache prefixes under 1024 tokens, so shorter prompts
+    # are sent as plain strings rather than marked for caching
+    MIN_CACHEABLE_TOKENS = 1024
+    CHARS_PER_TOKEN = 4  # rough estimate where an exact count isn't worth it
+    RESPONSE_CACHE_SIZE = 1024  # identical requests answered without a call
+
     def __init__(self, api_key: str):
         """Initialize Anthropic clients and model name."""
-        self.std_client = Anthropic(api_key=api_key)
-        self.pdf_client = Anthropic(
+        self._api_key = api_key
+        self._limits = httpx.Limits(
+            max_connections=self.MAX_CONNECTIONS,
+            max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+        )
+        self.std_client = Anthropic(
+            api_key=api_key,
+            http_client=httpx.Client(
+                limits=self._limits, timeout=self.TIMEOUT, http2=True
+            ),
+        )
+        # for PDF requests; with_options() shares std_client's connection pool
+        self.pdf_client = self.std_client.with_options(
             default_headers={"anthropic-beta": "pdfs-2024-09-25"}
         )
+        # AsyncAnthropic clients by event loop, see async_client
+        self._async_clients = {}
+        self._async_clients_lock = threading.Lock()
         self.model_name = "claude-3-5-sonnet-20241022"
+        # Response text keyed by a hash of the request, least recently used first
+        self._responses = OrderedDict()
+        self._responses_lock = threading.Lock()
+
+    @property
+    def async_client(self) -> AsyncAnthropic:
+        """AsyncAnthropic client for the running event loop.
+
+        httpx's async pool belongs to the loop that opened its connections,
+        so each loop gets its own client, built on first use. Requests on
+        one loop multiplex over its HTTP/2 connections. Clients of loops
+        that have since closed are dropped.
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            for closed in [l for l in self._async_clients if l.is_closed()]:
+                del self._async_clients[closed]
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = AsyncAnthropic(
+                    api_key=self._api_key,
+                    http_client=httpx.AsyncClient(
+                        limits=self._limits, timeout=self.TIMEOUT, http2=True
+                    ),
+                )
+                self._async_clients[loop] = client
+        return client
+
+    def has_async_client(self) -> bool:
+        """Whether the running event loop already has an AsyncAnthropic client."""
+        with self._async_clients_lock:
+            return asyncio.get_running_loop() in self._async_clients
+
+    async def aclose_async_client(self) -> None:
+        """Close the running loop's AsyncAnthropic client and its connections."""
+        with self._async_clients_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
 
     # def _get_completion(self, client, messages):
     #     """Internal helper to get completions from Claude API."""
@@ -106,24 +187,38 @@ class AnthropicService:
     #     )
 
     def call_claude_basic(
-        self, max_tokens: int, input_string: str, system_string: str
+        self,
+        max_tokens: int,
+        input_string: str,
+        system_string: str,
+        cache: bool = True,
+        reuse: bool = False,
     ) -> str:
-        """Basic Claude call with system prompt and single user message."""
+        """Basic Claude call with system prompt and single user message.
+
+        Replies are sampled, so reuse is opt-in: with it, a request
+        identical to a recent one returns that response without calling
+        the API.
+        """
+        key = self._response_key("basic", max_tokens, system_string, input_string)
+        cached = self._cached_response(key) if reuse else None
+        if cached is not None:
+            return cached
         response = self.std_client.messages.create(
             model=self.model_name,
-            system=system_string,
+            system=self._system(system_string, cache),
             messages=[{"role": "user", "content": input_string}],
             max_tokens=max_tokens,
         )
-        return response.content[0].text
+        return self._remember_response(key, response.content[0].text)
 
     def call_claude_messages(
-        self, max_tokens: int, messages, system_string: str
+        self, max_tokens: int, messages, system_string: str, cache: bool = True
     ) -> str:
         """Complex Claude call supporting multiple messages and system prompt."""
         response = self.std_client.messages.create(
             model=self.model_name,
-            system=system_string,
+            system=self._system(system_string, cache),
             messages=messages,
             max_tokens=max_tokens,
         )
@@ -135,19 +230,305 @@ class AnthropicService:
         input_string: str,
         follow_up_message: str,
         system_string: str,
+        cache: bool = True,
+        reuse: bool = True,
     ) -> str:
-        """Follow-up Claude call with conversation history."""
+        """Follow-up Claude call with conversation history.
+
+        Runs at temperature 0, so by default a repeat of a recent request
+        returns that response instead of asking again.
+        """
+        key = self._response_key(
+            "follow_up", max_tokens, system_string, input_string, follow_up_message
+        )
+        cached = self._cached_response(key) if reuse else None
+        if cached is not None:
+            return cached
         response = self.std_client.messages.create(
             model=self.model_name,
             max_tokens=max_tokens,
-            system=system_string,
+            system=self._system(system_string, cache),
+            temperature=0,
+            messages=self._follow_up_messages(input_string, follow_up_message, cache),
+        )
+        text = response.content[0].text if response.content else None
+        return self._remember_response(key, text)
+
+    async def call_claude_basic_async(
+        self,
+        max_tokens: int,
+        input_string: str,
+        system_string: str,
+        cache: bool = True,
+        reuse: bool = False,
+    ) -> str:
+        """Async call_claude_basic, for overlapping many requests."""
+        key = self._response_key("basic", max_tokens, system_string, input_string)
+        cached = self._cached_response(key) if reuse else None
+        if cached is not None:
+            return cached
+        response = await self.async_client.messages.create(
+            model=self.model_name,
+            system=await self._system_async(system_string, cache),
+            messages=[{"role": "user", "content": input_string}],
+            max_tokens=max_tokens,
+        )
+        return self._remember_response(key, response.content[0].text)
+
+    async def call_claude_messages_async(
+        self, max_tokens: int, messages, system_string: str, cache: bool = True
+    ) -> str:
+        """Async call_claude_messages, for overlapping many requests."""
+        response = await self.async_client.messages.create(
+            model=self.model_name,
+            system=await self._system_async(system_string, cache),
+            messages=messages,
+            max_tokens=max_tokens,
+        )
+        return response.content[0].text
+
+    async def call_claude_follow_up_async(
+        self,
+        max_tokens: int,
+        input_string: str,
+        follow_up_message: str,
+        system_string: str,
+        cache: bool = True,
+        reuse: bool = True,
+    ) -> str:
+        """Async call_claude_follow_up, for overlapping many requests."""
+        key = self._response_key(
+            "follow_up", max_tokens, system_string, input_string, follow_up_message
+        )
+        cached = self._cached_response(key) if reuse else None
+        if cached is not None:
+            return cached
+        response = await self.async_client.messages.create(
+            model=self.model_name,
+            max_tokens=max_tokens,
+            system=await self._system_async(system_string, cache),
             temperature=0,
-            messages=[
-                {"role": "user", "content": input_string},
-                {"role": "assistant", "content": follow_up_message},
-            ],
+            messages=self._follow_up_messages(input_string, follow_up_message, cache),
+        )
+        text = response.content[0].text if response.content else None
+        return self._remember_response(key, text)
+
+    def call_claude_chain(
+        self, max_tokens: int, prompts, system_string: str, cache: bool = True
+    ) -> list:
+        """Ask prompts in order as one conversation and return each reply.
+
+        Every step sees the earlier prompts and replies, so it can build on
+        the previous answer without the caller pasting it back in. The
+        requests go out back to back on the client's kept-alive connection.
+        """
+        messages, replies = [], []
+        for prompt in prompts:
+            messages.append({"role": "user", "content": prompt})
+            reply = self.call_claude_messages(max_tokens, messages, system_string, cache)
+            messages.append({"role": "assistant", "content": reply})
+            replies.append(reply)
+        return replies
+
+    async def call_claude_chain_async(
+        self, max_tokens: int, prompts, system_string: str, cache: bool = True
+    ) -> list:
+        """Async call_claude_chain; the steps still run one after another."""
+        messages, replies = [], []
+        for prompt in prompts:
+            messages.append({"role": "user", "content": prompt})
+            reply = await self.call_claude_messages_async(
+                max_tokens, messages, system_string, cache
+            )
+            messages.append({"role": "assistant", "content": reply})
+            replies.append(reply)
+        return replies
+
+    def call_claude_stream(
+        self, max_tokens: int, input_string: str, system_string: str, cache: bool = True
+    ):
+        """Basic Claude call that yields the response text as it arrives.
+
+        Suits st.write_stream, which shows the first tokens without waiting
+        for the whole completion.
+        """
+        with self.std_client.messages.stream(
+            model=self.model_name,
+            system=self._system(system_string, cache),
+            messages=[{"role": "user", "content": input_string}],
+            max_tokens=max_tokens,
+        ) as stream:
+            yield from stream.text_stream
+
+    async def call_claude_stream_async(
+        self, max_tokens: int, input_string: str, system_string: str, cache: bool = True
+    ):
+        """Async call_claude_stream, for consuming text inside an event loop."""
+        async with self.async_client.messages.stream(
+            model=self.model_name,
+            system=await self._system_async(system_string, cache),
+            messages=[{"role": "user", "content": input_string}],
+            max_tokens=max_tokens,
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    async def call_claude_many_async(
+        self, max_tokens: int, input_strings, system_string: str
+    ) -> list:
+        """Send one basic call per input concurrently; results keep input order."""
+        return await asyncio.gather(
+            *(
+                self.call_claude_basic_async(max_tokens, input_string, system_string)
+                for input_string in input_strings
+            )
+        )
+
+    def submit_batch(
+        self, max_tokens: int, inputs: dict, system_string: str, cache: bool = True
+    ) -> str:
+        """Queue one basic call per input on the Message Batches API.
+
+        Batched requests cost half as much but can take up to a day, so this
+        suits bulk jobs nobody is waiting on. `inputs` maps a caller-chosen
+        custom_id to its input string. Returns the batch id.
+        """
+        system = self._system(system_string, cache)
+        batch = self.std_client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": custom_id,
+                    "params": {
+                        "model": self.model_name,
+                        "max_tokens": max_tokens,
+                        "system": system,
+                        "messages": [{"role": "user", "content": input_string}],
+                    },
+                }
+                for custom_id, input_string in inputs.items()
+            ]
         )
-        return response.content[0].text if response.content else None
+        return batch.id
+
+    def get_batch_results(self, batch_id: str) -> dict:
+        """Text of each finished batch request keyed by custom_id; None if it failed."""
+        results = {}
+        for entry in self.std_client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = entry.result.message.content[0].text
+            else:
+                logger.error(
+                    "Batch %s request %s %s", batch_id, entry.custom_id, entry.result.type
+                )
+                results[entry.custom_id] = None
+        return results
+
+    def run_batch_sync(
+        self,
+        max_tokens: int,
+        inputs: dict,
+        system_string: str,
+        poll_interval: float = 20,
+    ) -> dict:
+        """Submit a batch, wait for it to end, and return its results."""
+        batch_id = self.submit_batch(max_tokens, inputs, system_string)
+        while (
+            self.std_client.messages.batches.retrieve(batch_id).processing_status
+            != "ended"
+        ):
+            time.sleep(poll_interval)
+        return self.get_batch_results(batch_id)
+
+    def _response_key(self, *parts) -> str:
+        return hashlib.sha256(
+            json.dumps([self.model_name, *parts]).encode("utf-8")
+        ).hexdigest()
+
+    def _cached_response(self, key: str):
+        with self._responses_lock:
+            if key not in self._responses:
+                return None
+            self._responses.move_to_end(key)
+            return self._responses[key]
+
+    def _remember_response(self, key: str, text):
+        if text is not None:
+            with self._responses_lock:
+                self._responses[key] = text
+                self._responses.move_to_end(key)
+                if len(self._responses) > self.RESPONSE_CACHE_SIZE:
+                    self._responses.popitem(last=False)
+        return text
+
+    def _system(self, system_string: str, cache: bool):
+        """System prompt, marked as a cache breakpoint when it is long enough."""
+        # Every token is at least one character, so a shorter prompt can't qualify
+        if not cache or len(system_string) < self.MIN_CACHEABLE_TOKENS:
+            return system_string
+        if self._system_tokens(system_string) < self.MIN_CACHEABLE_TOKENS:
+            return system_string
+        return self._cached_system(system_string)
+
+    async def _system_async(self, system_string: str, cache: bool):
+        """_system for coroutines, counting tokens off the event loop.
+
+        The count is a blocking HTTP call the first time a prompt is seen,
+        so it runs on a worker thread and other requests keep going.
+        """
+        if not cache or len(system_string) < self.MIN_CACHEABLE_TOKENS:
+            return system_string
+        tokens = await asyncio.to_thread(self._system_tokens, system_string)
+        if tokens < self.MIN_CACHEABLE_TOKENS:
+            return system_string
+        return self._cached_system(system_string)
+
+    @staticmethod
+    def _cached_system(system_string: str) -> list:
+        """System prompt as one text block marked as a cache breakpoint."""
+        return [
+            {
+                "type": "text",
+                "text": system_string,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+
+    def _system_tokens(self, system_string: str) -> int:
+        """Token count of a system prompt, estimated if it can't be counted.
+
+        Callers reuse a handful of long system prompts, so each is sent to
+        the token counting endpoint once and the count is cached.
+        """
+        try:
+            return _count_system_tokens(
+                self.std_client, self.model_name, system_string
+            )
+        except APIError as e:
+            logger.debug("Token count failed, estimating instead: %s", e)
+            return len(system_string) // self.CHARS_PER_TOKEN
+
+    def _follow_up_messages(
+        self, input_string: str, follow_up_message: str, cache: bool
+    ) -> list:
+        """Follow-up history, checkpointed at the branch point when long enough.
+
+        Follow-ups re-send the same long input with different continuations,
+        so caching through the assistant turn lets each branch reuse it.
+        """
+        assistant_content = follow_up_message
+        chars = len(input_string) + len(follow_up_message)
+        if cache and chars >= self.MIN_CACHEABLE_TOKENS * self.CHARS_PER_TOKEN:
+            assistant_content = [
+                {
+                    "type": "text",
+                    "text": follow_up_message,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+        return [
+            {"role": "user", "content": input_string},
+            {"role": "assistant", "content": assistant_content},
+        ]
 
     def test_anthropic(self):
         # Test basic call
@@ -156,7 +537,7 @@ class AnthropicService:
             input_string="Hello!",
             system_string="You are a helpful assistant",
         )
-        print("Basic Call Response:", response_basic)
+        logger.debug("Basic Call Response: %s", response_basic)
 
         # Test complex call with multiple messages
         messages = [
@@ -169,7 +550,7 @@ class AnthropicService:
             messages=messages,
             system_string="You are a helpful assistant",
         )
-        print("Complex Call Response:", response_complex)
+        logger.debug("Complex Call Response: %s", response_complex)
 
         # Test follow-up call
         response_follow_up = self.call_claude_follow_up(
@@ -178,12 +559,13 @@ class AnthropicService:
             follow_up_message="Why did the chicken cross the road?",
             system_string="You are a snarky know it all assistant",
         )
-        print("Follow-up Call Response:", response_follow_up)
+        logger.debug("Follow-up Call Response: %s", response_follow_up)
 
         return response_basic, response_complex, response_follow_up
 
 
 if __name__ == "__main__":
+    ensure_env_loaded()
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     anthropic = AnthropicService(api_key)
     anthropic.test_anthropic()
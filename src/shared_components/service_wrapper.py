@@ -1,9 +1,41 @@
+import time
+from collections import Counter
+from functools import wraps
+
 import streamlit as st
-from src.core.services.google_drive import GoogleDriveService
-from src.core.services.supabase_client import SupabaseService
+from src.services.exceptions import GoogleDriveError, SupabaseAuthenticationError
+from src.services.supabase_service import SupabaseService, get_service_loop
 
-def get_drive_service():
-    """Get Google Drive service with Streamlit secrets."""
+# Per-process call/miss counters for the cached wrappers below. Cached
+# bodies only run on a miss, so each one bumps "<name>:misses" itself.
+_stats = Counter()
+
+def _instrumented(name):
+    """Count calls to a cached wrapper and the wall time spent in it."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _stats[f"{name}:calls"] += 1
+                _stats[f"{name}:ns"] += time.perf_counter_ns() - start
+        return wrapper
+    return decorator
+
+def show_cache_stats():
+    """Render the counters in the sidebar when the URL has ?debug=1."""
+    if st.query_params.get("debug") == "1":
+        st.sidebar.json(dict(_stats))
+
+@st.cache_resource(ttl=3600)
+def _build_drive_service():
+    """Build the Drive service once per process; failures are not cached."""
+    # Imported here so Supabase-only pages skip the googleapiclient import tree
+    from src.services.google_drive import GoogleDriveService
+
+    _stats["drive:misses"] += 1
     credentials = {
         "project_id": "fabled-imagery-444902-k1",
         "private_key": st.secrets["PRIVATE_KEY"],
@@ -12,20 +44,188 @@ def get_drive_service():
         "client_id": st.secrets["CLIENT_ID"],
         "client_x509_cert_url": st.secrets["CLIENT_X509_CERT_URL"]
     }
-    
+
     drive_service = GoogleDriveService(credentials)
     if not drive_service.initialize_service():
+        raise GoogleDriveError("Failed to initialize Drive service")
+    return drive_service
+
+@_instrumented("drive")
+def get_drive_service():
+    """Get Google Drive service with Streamlit secrets."""
+    try:
+        return _build_drive_service()
+    except GoogleDriveError:
         st.error("Failed to initialize Drive service")
         return None
-    return drive_service
 
-def get_supabase_service():
-    """Get Supabase service with Streamlit secrets."""
-    supabase = SupabaseService(
-        url=st.secrets["SUPABASE_URL"],
-        key=st.secrets["SUPABASE_KEY"]
+@st.cache_resource(ttl=3600)
+def _build_pydrive_service():
+    """Build the PyDrive2 client once per process; failures are not cached."""
+    # Imported here so Supabase-only pages skip PyDrive2 and oauth2client
+    from src.services.google_pydrive2 import GooglePyDrive2
+
+    _stats["pydrive:misses"] += 1
+    return GooglePyDrive2(
+        st.secrets["PRIVATE_KEY"],
+        st.secrets["PRIVATE_KEY_ID"],
+        st.secrets["CLIENT_EMAIL"],
+        st.secrets["CLIENT_ID"],
     )
-    if not supabase.initialize_client():
-        st.error("Failed to initialize Supabase client")
+
+@_instrumented("pydrive")
+def get_pydrive_service():
+    """Get PyDrive2 client with Streamlit secrets."""
+    try:
+        return _build_pydrive_service()
+    except Exception as e:
+        st.error(f"Failed to authenticate with PyDrive: {e}")
+        return None
+
+@_instrumented("supabase")
+def get_supabase_service():
+    """Get this session's Supabase service, built on its first use.
+
+    Kept in session_state so reruns reuse the client and its connections,
+    while each visitor's sign-in and auth listener stay with their own
+    session. Sync calls run on the shared service loop, so it doesn't
+    matter which thread a rerun happens on.
+    """
+    service = st.session_state.get("_supabase_service")
+    if service is None:
+        _stats["supabase:misses"] += 1
+        service = SupabaseService(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+        st.session_state["_supabase_service"] = service
+    return service
+
+def session_expired(auth_session, leeway=60):
+    """True when the stored access token expires within `leeway` seconds."""
+    expires_at = auth_session["session"].get("expires_at")
+    return not expires_at or expires_at - leeway <= time.time()
+
+def refresh_auth_session(auth_session):
+    """Swap the stored refresh token for a new session, or None on failure.
+
+    Refreshes through this session's Supabase service, which then holds
+    the new tokens too, so its later queries run as the same user.
+    """
+    try:
+        response = get_supabase_service().refresh_session_sync(
+            auth_session["session"]["refresh_token"]
+        )
+    except SupabaseAuthenticationError:
+        return None
+    if not response or not response.session:
         return None
-    return supabase 
\ No newline at end of file
+    return {
+        "user": auth_session["user"],
+        "session": {
+            "access_token": response.session.access_token,
+            "expires_at": response.session.expires_at,
+            "refresh_token": response.session.refresh_token,
+        },
+    }
+
+@_instrumented("anthropic")
+@st.cache_resource
+def get_anthropic_service():
+    """Get the Anthropic service with Streamlit secrets, built once per process.
+
+    The SDK clients hold their own connection pools, so sharing them
+    across reruns and sessions keeps those connections warm.
+    """
+    # Imported here so pages without Claude skip the anthropic SDK import
+    from src.services.support_claude import AnthropicService
+
+    _stats["anthropic:misses"] += 1
+    return AnthropicService(st.secrets["ANTHROPIC_API_KEY"])
+
+def warm_services():
+    """Build the shared clients before the first page renders.
+
+    PyDrive2's constructor already fetches one folder page, which opens
+    the TLS connection and validates the credentials up front. The
+    builders are cached themselves and don't cache failures, so a failed
+    probe is retried on the next rerun. The Supabase service is per
+    session and is built on first use.
+
+    Returns:
+        An error message for the caller to show, or None when all is ready
+    """
+    get_service_loop()
+    try:
+        _build_pydrive_service()
+    except Exception as e:
+        return f"Failed to authenticate with PyDrive: {e}"
+    return None
+
+@st.cache_resource
+def get_database_pool():
+    """Get the direct Postgres pool, or None when SUPABASE_DB_URL is not set."""
+    dsn = st.secrets.get("SUPABASE_DB_URL")
+    if not dsn:
+        return None
+    # Imported here so deployments without a DSN never import asyncpg
+    from src.services.database_pool import AsyncDatabasePool
+
+    return AsyncDatabasePool(dsn)
+
+# Tables confirmed to have no row level security. Only these may be read
+# over the asyncpg pool, which connects as the DSN's role and so skips RLS.
+POOL_TABLES = frozenset()
+
+def _quote_ident(name):
+    """Quote a Postgres identifier, doubling any embedded quotes."""
+    return '"' + name.replace('"', '""') + '"'
+
+def _session_scope(supabase_client):
+    """Cache key part for whose rows a client can see: user id, or "anon"."""
+    session = getattr(supabase_client, "session", None)
+    user = getattr(session, "user", None)
+    return getattr(user, "id", None) or "anon"
+
+def _select_all(supabase_client, table_name, columns="*"):
+    """Read every row of a table, over asyncpg when that is safe.
+
+    columns is "*" or a tuple of column names to fetch. Tables not in
+    POOL_TABLES go through PostgREST so the session's RLS applies.
+    """
+    pool = get_database_pool() if table_name in POOL_TABLES else None
+    if pool:
+        select_list = (
+            "*" if columns == "*" else ", ".join(_quote_ident(c) for c in columns)
+        )
+        return pool.fetch_sync(
+            f"select {select_list} from public.{_quote_ident(table_name)}"
+        )
+    return supabase_client.select_from_table_sync(
+        table_name, "*" if columns == "*" else list(columns)
+    )
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_rows(_supabase_client, table_name, scope, columns):
+    """Rows of a table, cached for a minute per table, user and columns.
+
+    The underscore skips hashing the client; scope stands in for it so
+    one user's RLS-filtered rows are never served to another.
+    """
+    _stats[f"{table_name}:misses"] += 1
+    return _select_all(_supabase_client, table_name, columns)
+
+@_instrumented("test")
+def get_test_users(supabase_client, columns="*"):
+    """Rows of the test table as plain dicts, cached for a minute.
+
+    Returning the list rather than the APIResponse keeps the cached value
+    cheap to hash and copy. Pass a tuple of column names to fetch only those.
+    """
+    return _cached_rows(
+        supabase_client, "test", _session_scope(supabase_client), columns
+    )
+
+@_instrumented("todos")
+def get_todos(supabase_client, columns="*"):
+    """Rows of the todos table as plain dicts, cached for a minute."""
+    return _cached_rows(
+        supabase_client, "todos", _session_scope(supabase_client), columns
+    )
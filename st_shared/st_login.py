@@ -9,6 +9,7 @@ project_root = str(Path(__file__).parent.parent)
 sys.path.insert(0, project_root)
 from st_shared.streamlit_base import StreamlitBase
 from src.services.supabase_service import SupabaseService
+from src.shared_components.service_wrapper import get_supabase_service, get_test_users
 
 
 class AsyncLoginConnection:
@@ -307,6 +308,21 @@ class LoginManager(StreamlitBase):
                 self.render_logout()
 
 
+def test_supabase_connection():
+    """Check that the session's Supabase client can read from the database.
+
+    Uses the client from get_supabase_service(), so running the check
+    again doesn't build a new client and connection pool each time.
+    """
+    try:
+        users = get_test_users(get_supabase_service(), ("id",))
+    except Exception as e:
+        st.error(f"Supabase connection failed: {e}")
+        return False
+    st.success(f"Connected to Supabase ({len(users)} test users)")
+    return True
+
+
 if __name__ == "__main__":
     app = LoginManager()
     app.main()
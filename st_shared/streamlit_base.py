@@ -1,5 +1,10 @@
 import streamlit as st
+import atexit
 import logging
+import queue
+import threading
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 import sys
 import asyncio
@@ -9,6 +14,51 @@ from typing import Optional
 project_root = str(Path(__file__).parent.parent)
 sys.path.insert(0, project_root)
 
+LOG_FILE = "app.log"  # You can specify path like 'logs/app.log'
+
+_log_queue = queue.Queue(-1)
+_log_listener = None
+_log_listener_lock = threading.Lock()
+
+
+def _start_log_listener():
+    """Start the thread that writes queued records to the console and file.
+
+    Loggers only put records on the queue, so async handlers never block
+    on disk or terminal I/O. One listener serves the whole process.
+    """
+    global _log_listener
+    with _log_listener_lock:
+        if _log_listener is not None:
+            return
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        # delay=True leaves the file unopened until the first record
+        file_handler = logging.FileHandler(LOG_FILE, delay=True)
+        file_handler.setFormatter(formatter)
+        _log_listener = QueueListener(_log_queue, console_handler, file_handler)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+
+
+@lru_cache(maxsize=None)
+def _configure_logger(module_name: str) -> logging.Logger:
+    """Wire up a module's logger the first time it is asked for.
+
+    Pages build a new StreamlitBase on every rerun; without this each one
+    added another handler to the same logger and every line was logged
+    once per rerun so far.
+    """
+    _start_log_listener()
+    logger = logging.getLogger(module_name)
+    logger.setLevel(logging.DEBUG)
+    # Console and file output happen on the listener thread
+    logger.addHandler(QueueHandler(_log_queue))
+    return logger
+
 
 @dataclass
 class AppState:
@@ -25,23 +75,7 @@ class StreamlitBase:
         self._init_session_state()
 
     def _setup_logger(self, module_name: str):
-        logger = logging.getLogger(module_name)
-        logger.setLevel(logging.DEBUG)
-        # Create console handler with formatting
-        console_handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-        # File Handler
-        file_handler = logging.FileHandler(
-            "app.log"
-        )  # You can specify path like 'logs/app.log'
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-
-        return logger
+        return _configure_logger(module_name)
 
     def _init_session_state(self):
         """Initialize session state with default values"""
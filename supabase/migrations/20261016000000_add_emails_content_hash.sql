@@ -0,0 +1,15 @@
+-- Hash of sender and content, so extract_recent_emails can find duplicates
+-- with one "in" query per batch instead of comparing whole bodies per email
+
+ALTER TABLE emails ADD COLUMN IF NOT EXISTS content_hash char(64);
+
+-- Same value Emails._content_hash computes: sha256 of sender, newline, content
+UPDATE emails
+SET content_hash = encode(
+  sha256(convert_to(coalesce(sender, '') || E'\n' || coalesce(content, ''), 'UTF8')),
+  'hex'
+)
+WHERE content_hash IS NULL;
+
+-- Not unique: rows imported before this check existed may already repeat
+CREATE INDEX IF NOT EXISTS emails_content_hash_idx ON emails (content_hash);
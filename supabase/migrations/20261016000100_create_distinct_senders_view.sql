@@ -0,0 +1,9 @@
+-- One row per sender, so Emails.get_email_addresses gets the deduplicated
+-- list from Postgres instead of downloading every row's sender
+
+-- security_invoker keeps the emails table's row level security in effect
+CREATE OR REPLACE VIEW distinct_senders WITH (security_invoker = true) AS
+SELECT DISTINCT sender FROM emails WHERE sender IS NOT NULL;
+
+-- Lets the DISTINCT read the index instead of the whole table
+CREATE INDEX IF NOT EXISTS emails_sender_idx ON emails (sender);
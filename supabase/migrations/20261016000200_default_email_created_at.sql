@@ -0,0 +1,6 @@
+-- Let Postgres stamp new rows, so Emails no longer sends a formatted
+-- created_at with every email, attachment and URL it inserts
+
+ALTER TABLE emails ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE attachments ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE all_email_urls ALTER COLUMN created_at SET DEFAULT now();
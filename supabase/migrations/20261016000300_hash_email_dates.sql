@@ -0,0 +1,18 @@
+-- Add the date to content_hash, so the same body sent on different days
+-- is no longer treated as a duplicate. Recomputes every row's hash.
+
+-- ::timestamptz reads a zoneless date as UTC, the same as Emails does
+SET LOCAL TIME ZONE 'UTC';
+
+-- Same value Emails._content_hash computes: sha256 of sender, newline,
+-- UTC date to the second, newline, content
+UPDATE emails
+SET content_hash = encode(
+  sha256(convert_to(
+    coalesce(sender, '') || E'\n' ||
+    coalesce(to_char(date::timestamptz AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS'), '') || E'\n' ||
+    coalesce(content, ''),
+    'UTF8'
+  )),
+  'hex'
+);
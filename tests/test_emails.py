@@ -0,0 +1,207 @@
+import email
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import sys
+
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from src.db.emails import URL_RE, Emails
+
+
+class _NoSupabase:
+    """Stands in for SupabaseService where no request should be made."""
+
+
+class _EmptyEmailsTable:
+    """SupabaseService whose emails table holds no rows yet."""
+
+    def __init__(self):
+        self.selects = []
+
+    def select_from_table_sync(self, table_name, fields, where_filters):
+        self.selects.append(where_filters)
+        return []
+
+
+class FakeIMAP:
+    """Records SEARCH commands and answers each with the next id list."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.searches = []
+
+    def search(self, charset, criteria):
+        self.searches.append(criteria)
+        return "OK", [self.responses.pop(0)]
+
+
+def make_emails(supabase_client=None):
+    return Emails(supabase_client=supabase_client or _NoSupabase())
+
+
+def parsed_email(**overrides):
+    email_data = {
+        "subject": "Weekly notes",
+        "sender": "alice@example.com",
+        "date": datetime(2024, 11, 5, 9, 30, tzinfo=timezone.utc),
+        "attachments": [{"filename": "notes.pdf", "size": 1024}],
+        "to_recipients": {"recipients": ["bob@example.com"]},
+        "content": "See https://example.com/notes",
+        "urls": {"urls": ["https://example.com/notes"]},
+    }
+    email_data.update(overrides)
+    return email_data
+
+
+def test_email_row_is_json_serializable():
+    row = make_emails()._email_row(parsed_email(), "bob@example.com")
+
+    decoded = json.loads(json.dumps(row))
+
+    assert decoded["date"] == "2024-11-05T09:30:00+00:00"
+    assert decoded["attachment_cnt"] == 1
+    assert decoded["url_cnt"] == 1
+    assert decoded["content_hash"] == Emails._content_hash(parsed_email())
+
+
+def test_extract_to_recipients_handles_quoted_commas():
+    message = email.message_from_string(
+        'To: "Doe, John" <john@example.com>, jane@example.com\n'
+        "To: Team: lead@example.com, dev@example.com;\n"
+        "\n"
+        "body"
+    )
+
+    result = make_emails()._extract_to_recipients(message)
+
+    assert result == {
+        "recipients": [
+            "john@example.com",
+            "jane@example.com",
+            "lead@example.com",
+            "dev@example.com",
+        ]
+    }
+
+
+def test_extract_to_recipients_without_to_header():
+    message = email.message_from_string("Subject: hi\n\nbody")
+
+    assert make_emails()._extract_to_recipients(message) == {"recipients": []}
+
+
+def test_content_hash_depends_on_sender_date_and_content():
+    base = Emails._content_hash(parsed_email())
+
+    assert len(base) == 64
+    assert base == Emails._content_hash(parsed_email(subject="Other subject"))
+    assert base != Emails._content_hash(parsed_email(sender="bob@example.com"))
+    assert base != Emails._content_hash(parsed_email(content="Different body"))
+    assert base != Emails._content_hash(
+        parsed_email(date=datetime(2024, 11, 12, 9, 30, tzinfo=timezone.utc))
+    )
+
+
+def test_content_hash_compares_dates_in_utc():
+    pacific = timezone(timedelta(hours=-8))
+    same_instant = datetime(2024, 11, 5, 1, 30, tzinfo=pacific)
+
+    assert Emails._content_hash(parsed_email()) == Emails._content_hash(
+        parsed_email(date=same_instant)
+    )
+    # A -0000 Date header parses to a naive datetime, taken as UTC
+    assert Emails._content_hash(parsed_email()) == Emails._content_hash(
+        parsed_email(date=datetime(2024, 11, 5, 9, 30))
+    )
+
+
+def test_drop_existing_emails_keeps_same_body_on_different_dates():
+    supabase = _EmptyEmailsTable()
+    monday = parsed_email()
+    next_monday = parsed_email(date=datetime(2024, 11, 12, 9, 30, tzinfo=timezone.utc))
+    repeat = parsed_email()
+
+    kept = make_emails(supabase)._drop_existing_emails(
+        [(email_data, "bob@example.com") for email_data in (monday, next_monday, repeat)]
+    )
+
+    assert [email_data for email_data, _ in kept] == [monday, next_monday]
+    assert len(supabase.selects) == 1
+
+
+def test_url_re_stops_at_delimiters():
+    text = 'Links: <https://a.example/x?y=1>, "http://b.example/p" (https://c.example).'
+
+    assert URL_RE.findall(text) == [
+        "https://a.example/x?y=1",
+        "http://b.example/p",
+        "https://c.example",
+    ]
+
+
+def test_search_from_nests_or_within_one_batch():
+    emails = make_emails()
+    emails.set_begin_and_end_date(datetime(2024, 1, 1), datetime(2024, 2, 1))
+    mail = FakeIMAP([b"3 1"])
+
+    ids = emails._search_from(mail, ["c@x.com", "a@x.com", "b@x.com"])
+
+    assert ids == [b"1", b"3"]
+    assert mail.searches == [
+        '(SINCE "01-Jan-2024" BEFORE "01-Feb-2024" '
+        'OR FROM "a@x.com" OR FROM "b@x.com" FROM "c@x.com")'
+    ]
+
+
+def test_search_from_splits_at_batch_boundary():
+    emails = make_emails()
+    emails.set_begin_and_end_date(datetime(2024, 1, 1), datetime(2024, 2, 1))
+    addresses = [f"user{i:02d}@x.com" for i in range(Emails.SEARCH_ADDRESS_BATCH + 1)]
+
+    exact = FakeIMAP([b"1"])
+    emails._search_from(exact, addresses[: Emails.SEARCH_ADDRESS_BATCH])
+    assert len(exact.searches) == 1
+    assert exact.searches[0].count("FROM") == Emails.SEARCH_ADDRESS_BATCH
+
+    over = FakeIMAP([b"5 2", b"2 9"])
+    ids = emails._search_from(over, addresses)
+    assert len(over.searches) == 2
+    assert over.searches[1].endswith(f'FROM "{addresses[-1]}")')
+    assert "OR FROM" not in over.searches[1]
+    # Ids found by both searches are merged and sorted numerically
+    assert ids == [b"2", b"5", b"9"]
+
+
+def test_search_from_without_addresses_sends_nothing():
+    emails = make_emails()
+    emails.set_begin_and_end_date(datetime(2024, 1, 1), datetime(2024, 2, 1))
+    mail = FakeIMAP([])
+
+    assert emails._search_from(mail, []) == []
+    assert mail.searches == []
+
+
+def test_safe_decode_ascii_and_declared_charset():
+    assert Emails._safe_decode(b"plain text", "utf-8") == "plain text"
+    assert Emails._safe_decode("café".encode("utf-8"), None) == "café"
+    assert Emails._safe_decode("café".encode("cp1252"), "cp1252") == "café"
+
+
+def test_safe_decode_falls_back_when_charset_is_wrong_or_unknown():
+    # Not valid UTF-8, so the declared charset and UTF-8 both fail
+    assert Emails._safe_decode(b"caf\xe9", "utf-8") == "café"
+    assert Emails._safe_decode("café".encode("utf-8"), "no-such-charset") == "café"
+
+
+def test_safe_decode_does_not_shortcut_utf16():
+    payload = "hi".encode("utf-16-le")
+    assert payload.isascii()
+
+    assert Emails._safe_decode(payload, "utf-16-le") == "hi"
+
+
+def test_safe_decode_empty_payload():
+    assert Emails._safe_decode(None) == ""
+    assert Emails._safe_decode(b"") == ""
@@ -0,0 +1,44 @@
+from pathlib import Path
+import sys
+
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from src.services.google_credentials import (
+    PRIVATE_KEY_BEGIN,
+    PRIVATE_KEY_END,
+    format_private_key,
+)
+
+KEY_BODY = "MIIEvQIBADANBgkqhkiG9w0BAQEFAASC\nBKcwggSjAgEAAoIBAQC7"
+
+
+def test_key_with_real_newlines_is_unchanged():
+    key = f"{PRIVATE_KEY_BEGIN}\n{KEY_BODY}\n{PRIVATE_KEY_END}\n"
+
+    assert format_private_key(key) == key
+
+
+def test_literal_backslash_n_becomes_newline():
+    escaped = f"{PRIVATE_KEY_BEGIN}\n{KEY_BODY}\n{PRIVATE_KEY_END}\n".replace(
+        "\n", "\\n"
+    )
+
+    assert format_private_key(escaped) == (
+        f"{PRIVATE_KEY_BEGIN}\n{KEY_BODY}\n{PRIVATE_KEY_END}\n"
+    )
+
+
+def test_missing_end_marker_is_added():
+    key = f"{PRIVATE_KEY_BEGIN}\n{KEY_BODY}".replace("\n", "\\n")
+
+    formatted = format_private_key(key)
+
+    assert "\\n" not in formatted
+    assert formatted == f"{PRIVATE_KEY_BEGIN}\n{KEY_BODY}\n{PRIVATE_KEY_END}\n"
+
+
+def test_missing_both_markers_are_added():
+    assert format_private_key(KEY_BODY) == (
+        f"{PRIVATE_KEY_BEGIN}\n{KEY_BODY}\n{PRIVATE_KEY_END}\n"
+    )